@@ -0,0 +1,114 @@
+"""Generate synthetic latex-ji18n projects for benchmarks."""
+
+import os
+import random
+
+import click
+
+
+def _yaml_mapping(rng, prefix, n_keys, depth, indent=0):
+    lines = []
+    for i in range(n_keys):
+        key = "%s%d" % (prefix, i)
+        if depth > 1 and i % 4 == 0:
+            lines.append("%s%s:" % (" " * indent, key))
+            lines.extend(_yaml_mapping(
+                rng, prefix, max(n_keys // 4, 1), depth - 1, indent + 2))
+        else:
+            lines.append("%s%s: \"%s %d\"" % (
+                " " * indent, key, prefix, rng.randint(0, 10 ** 6)))
+    return lines
+
+
+def _write(filepath, content):
+    dirpath = os.path.dirname(filepath)
+    if not os.path.exists(dirpath):
+        os.makedirs(dirpath)
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def generate_project(
+    dirpath,
+    languages=3,
+    keys=100,
+    depth=2,
+    template_lines=200,
+    includes=5,
+    bib_entries=500,
+    seed=0,
+):
+    """Write a project with ``languages`` i18n files of ``keys`` keys nested
+    ``depth`` levels, a template of ``template_lines`` lines split in
+    ``includes`` included templates and a ``.bib`` file with ``bib_entries``
+    entries. The same arguments always generate the same project."""
+    rng = random.Random(seed)
+
+    _write(os.path.join(dirpath, "_config", "data.yml"), "\n".join(
+        ["items:"] + ["  - item %d" % i for i in range(keys)]
+        + _yaml_mapping(rng, "data", keys, depth)) + "\n")
+    _write(os.path.join(dirpath, "_config", "layout.yml"), "margin: 2cm\n")
+    _write(os.path.join(dirpath, "_config", "style.yml"), "color: red\n")
+    _write(os.path.join(dirpath, "_config", "_private", "data.yml"),
+           "author: Private Author\n")
+    for i in range(languages):
+        _write(os.path.join(dirpath, "_i18n", "lang%d.yml" % i), "\n".join(
+            ["title: Title %d" % i] + _yaml_mapping(rng, "text", keys, depth)
+        ) + "\n")
+    if not os.path.exists(os.path.join(dirpath, "dist")):
+        os.makedirs(os.path.join(dirpath, "dist"))
+
+    body_lines = [
+        "\\VAR{text%d} and \\VAR{data%d}" % (i % keys, (i + 1) % keys)
+        for i in range(template_lines)
+    ]
+    chunk_size = max(len(body_lines) // (includes + 1), 1)
+    template = [
+        "\\documentclass{article}",
+        "\\usepackage[margin=\\VAR{layout.margin}]{geometry}",
+        "\\title{\\VAR{title}}",
+        "\\author{\\VAR{author}}",
+        "\\begin{document}",
+        "\\maketitle",
+        "\\BLOCK{for item in items}\\VAR{item}\\BLOCK{endfor}",
+    ]
+    for i in range(includes):
+        include_lines = body_lines[i * chunk_size:(i + 1) * chunk_size]
+        _write(os.path.join(dirpath, "src", "include%d.tex" % i),
+               "\n".join(include_lines) + "\n")
+        template.append("\\BLOCK{include 'include%d.tex'}" % i)
+    template.extend(body_lines[includes * chunk_size:])
+    if bib_entries:
+        template.append(
+            "\\BLOCK{for e in _bibdb.article}\\VAR{e.ID} \\BLOCK{endfor}")
+    template.append("\\end{document}")
+    _write(os.path.join(dirpath, "src", "template.tex"),
+           "\n".join(template) + "\n")
+
+    entry_types = ("article", "book", "inproceedings")
+    _write(os.path.join(dirpath, "src", "references.bib"), "\n".join(
+        "@%s{key%d,\n  author = {Author %d and Other %d},\n"
+        "  title = {Title of the work %d},\n  year = {%d},\n}\n" % (
+            entry_types[i % len(entry_types)], i, rng.randint(0, 100),
+            rng.randint(0, 100), i, 1980 + rng.randint(0, 40))
+        for i in range(bib_entries)
+    ))
+    return dirpath
+
+
+@click.command()
+@click.argument("dirpath", type=click.Path())
+@click.option("--languages", default=3, type=int)
+@click.option("--keys", default=100, type=int)
+@click.option("--depth", default=2, type=int)
+@click.option("--template-lines", default=200, type=int)
+@click.option("--includes", default=5, type=int)
+@click.option("--bib-entries", default=500, type=int)
+@click.option("--seed", default=0, type=int)
+def main(dirpath, **kwargs):
+    """Generate a synthetic project at DIRPATH."""
+    generate_project(dirpath, **kwargs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Check that the import time of the command line interface and of the
+build command stays under a budget, using ``python -X importtime``, and
+that they don't import the dependencies only needed by some builds.
+Exits with status 1 if some check fails.
+
+It is executed by ``pre-commit`` when the Python files of the package
+change. To run it manually, from the root of the repository::
+
+    python benchmarks/importtime.py
+"""
+
+import re
+import subprocess
+import sys
+
+import click
+
+
+# modules imported by the entry point and by the build command
+MODULES = ("latex_ji18n.__main__", "latex_ji18n.commands.build")
+
+# dependencies imported only when they are used
+LAZY_MODULES = ("bibtexparser", "inflection", "ruamel.yaml")
+
+IMPORTTIME_REGEX = re.compile(r"^import time:\s*(\d+) \|\s*(\d+) \|(\s*)(\S+)$")
+
+
+def import_times(module):
+    """Import a module in a new interpreter, returning the cumulative time
+    in microseconds spent importing each module imported, by name."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    response = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if match:
+            response[match.group(4)] = int(match.group(2))
+    return response
+
+
+@click.command()
+@click.option("--budget-ms", default=200, type=float, show_default=True,
+              help="Maximum import time of each module, in milliseconds.")
+@click.option("-r", "--repeat", default=5, type=int, show_default=True,
+              help="The minimum time of all the repetitions is used.")
+def main(budget_ms, repeat):
+    """Check the import time of latex-ji18n."""
+    failed = False
+    for module in MODULES:
+        samples = [import_times(module) for _ in range(repeat)]
+        elapsed_ms = min(times[module] for times in samples) / 1000
+
+        lazy_modules = [
+            lazy_module for lazy_module in LAZY_MODULES
+            if lazy_module in samples[0]
+        ]
+        if lazy_modules:
+            failed = True
+            click.echo("%s imports %s" % (module, ", ".join(lazy_modules)),
+                       err=True)
+
+        if elapsed_ms > budget_ms:
+            failed = True
+            slowest = sorted(
+                samples[0].items(), key=lambda item: item[1], reverse=True
+            )[1:6]
+            click.echo(
+                "%s: %.1f ms, budget of %.1f ms exceeded. Slowest imports: %s" % (
+                    module, elapsed_ms, budget_ms, ", ".join(
+                        "%s (%.1f ms)" % (name, us / 1000) for name, us in slowest
+                    ),
+                ),
+                err=True,
+            )
+        else:
+            click.echo("%s: %.1f ms" % (module, elapsed_ms))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Benchmark the phases of a build of a synthetic project, writing the
+timings as JSON so runs can be compared between changes.
+
+The phases are:
+
+- ``prepare``: preparation of the project and language contexts.
+- ``load``: load of the data and i18n files into the contexts.
+- ``bib``: parse of the ``.bib`` files.
+- ``render``: render of the template of each language.
+- ``commands``: execution of the commands pipe of each language.
+
+The commands are executed with the stubs of ``pdflatex`` and ``biber``
+located in the ``stubs`` directory, unless ``--tex`` is passed, so the
+benchmarks don't need TeX installed and measure the overhead of
+latex-ji18n instead of the time spent by TeX.
+
+Each repetition is cold by default, building a project generated again
+without the memory caches of YAML and ``.bib`` files, use ``--warm`` to
+build the same project keeping the caches between repetitions.
+
+With latex-ji18n installed (``pip install -e .``), run::
+
+    python benchmarks/run.py --languages 10 --output results.json
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+import click
+from generate import generate_project
+
+import latex_ji18n
+from latex_ji18n import io as latex_ji18n_io
+from latex_ji18n.biber import _entries_by_type_cache
+from latex_ji18n.commands.build import ProjectBuilder
+from latex_ji18n.context import LanguageContext, ProjectContext
+
+
+PHASES = ("prepare", "load", "bib", "render", "commands")
+
+STUBS_DIRPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+
+
+@contextlib.contextmanager
+def timer(timings, phase):
+    start = time.perf_counter()
+    yield
+    timings[phase] = time.perf_counter() - start
+
+
+def clear_caches():
+    latex_ji18n_io._yaml_files_cache.clear()
+    _entries_by_type_cache.clear()
+
+
+def run_once(project_path, commands):
+    """Build all the languages of a project once, returning the time spent
+    in each phase, in seconds."""
+    timings = {}
+    builder = ProjectBuilder(project_path=project_path, commands=commands)
+
+    with timer(timings, "prepare"):
+        project_context = ProjectContext(project_path=project_path)
+        project_context._prepare()
+        language_contexts = [
+            LanguageContext(language=language, project_context=project_context)
+            for language in sorted(project_context.discover_languages())
+        ]
+        for language_context in language_contexts:
+            language_context._prepare()
+    builder.project_context = project_context
+
+    with timer(timings, "load"):
+        for language_context in language_contexts:
+            language_context.load()
+
+    with timer(timings, "bib"):
+        project_context.bibdb.entries_by_type
+
+    with timer(timings, "render"):
+        errors = builder.renderer.render_many(
+            project_context.template_filepath,
+            {
+                language_context._get_meta("language"): language_context
+                for language_context in language_contexts
+            },
+        )
+        if errors:
+            raise click.ClickException(str(errors))
+
+    with timer(timings, "commands"):
+        for language_context in language_contexts:
+            returncode = asyncio.run(builder.compile_language(language_context))
+            if returncode != 0:
+                raise click.ClickException(
+                    "Commands pipe failed with exit status %d, see %s" % (
+                        returncode,
+                        builder.log_filepath(language_context._get_meta("language")),
+                    )
+                )
+    return timings
+
+
+def summarize(samples):
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": statistics.mean(samples),
+        "median": statistics.median(samples),
+        "samples": samples,
+    }
+
+
+@click.command()
+@click.option("--languages", default=3, type=int, show_default=True)
+@click.option("--keys", default=100, type=int, show_default=True,
+              help="Number of keys of each level of the YAML files.")
+@click.option("--depth", default=2, type=int, show_default=True,
+              help="Depth of the YAML files.")
+@click.option("--template-lines", default=200, type=int, show_default=True)
+@click.option("--includes", default=5, type=int, show_default=True,
+              help="Number of templates included by the template.")
+@click.option("--bib-entries", default=500, type=int, show_default=True)
+@click.option("--seed", default=0, type=int, show_default=True)
+@click.option("-c", "--commands", default="pdflatex,biber,pdflatex",
+              show_default=True, help="Commands pipe, separated by commas.")
+@click.option("-r", "--repeat", default=5, type=int, show_default=True)
+@click.option("--warm", is_flag=True,
+              help="Keep the caches between repetitions.")
+@click.option("--tex", is_flag=True,
+              help="Use the TeX executables instead of the stubs.")
+@click.option("-o", "--output", type=click.File("w"), default="-",
+              help="File to write the results, by default the standard output.")
+def main(repeat, warm, tex, commands, output, **project_kwargs):
+    """Benchmark the build of a synthetic project."""
+    if not tex:
+        os.environ["PATH"] = STUBS_DIRPATH + os.pathsep + os.environ["PATH"]
+    commands = commands.split(",")
+
+    samples = {phase: [] for phase in PHASES}
+    with tempfile.TemporaryDirectory() as tmp_dirpath:
+        project_path = os.path.join(tmp_dirpath, "project")
+        for nrepeat in range(repeat):
+            if nrepeat == 0 or not warm:
+                clear_caches()
+                if os.path.exists(project_path):
+                    shutil.rmtree(project_path)
+                generate_project(project_path, **project_kwargs)
+            for phase, seconds in run_once(project_path, commands).items():
+                samples[phase].append(seconds)
+
+    json.dump(
+        {
+            "latex_ji18n": latex_ji18n.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "project": project_kwargs,
+            "commands": commands,
+            "repeat": repeat,
+            "warm": warm,
+            "tex": tex,
+            "phases": {phase: summarize(samples[phase]) for phase in PHASES},
+            "total": summarize([
+                sum(samples[phase][i] for phase in PHASES) for i in range(repeat)
+            ]),
+        },
+        output,
+        indent=2,
+    )
+    output.write("\n")
+
+
+if __name__ == "__main__":
+    main()
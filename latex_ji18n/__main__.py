@@ -1,10 +1,73 @@
 #!/usr/bin/env python
 
 import os
+import sys
 
 import click
 
 
+def echo_build_results(results, project_path=None):
+    """Report the languages built and the logs of the failed ones, prefixed
+    by the name of the project if defined."""
+    prefix = ""
+    if project_path is not None:
+        prefix = "%s: " % os.path.basename(os.path.normpath(project_path))
+    if isinstance(results, Exception):
+        click.echo("%sBuild failed: %s" % (prefix, results), err=True)
+        return
+    for language in sorted(results):
+        result = results[language]
+        if result.skipped:
+            continue
+        if result.cached:
+            click.echo(
+                "%s%s: restored from the artifact cache" % (prefix, language),
+                err=True,
+            )
+        elif result.returncode == 0:
+            click.echo("%s%s: built" % (prefix, language), err=True)
+        elif result.error is not None:
+            click.echo(
+                "%s%s: failed: %s" % (prefix, language, result.error), err=True
+            )
+        else:
+            click.echo(
+                "%s%s: failed with exit status %d, see %s" % (
+                    prefix, language, result.returncode, result.log_filepath),
+                err=True,
+            )
+
+
+def echo_build_summary(results):
+    """Report the number of projects and languages built, skipped and failed
+    building many projects."""
+    failed_projects = 0
+    languages = {"built": 0, "restored": 0, "skipped": 0, "failed": 0}
+    for project_results in results.values():
+        if isinstance(project_results, Exception):
+            failed_projects += 1
+            continue
+        if any(result.returncode != 0 for result in project_results.values()):
+            failed_projects += 1
+        for result in project_results.values():
+            if result.returncode != 0:
+                languages["failed"] += 1
+            elif result.skipped:
+                languages["skipped"] += 1
+            elif result.cached:
+                languages["restored"] += 1
+            else:
+                languages["built"] += 1
+    click.echo(
+        "%d projects (%d failed), languages: %d built, %d restored from the"
+        " artifact cache, %d skipped, %d failed" % (
+            len(results), failed_projects, languages["built"],
+            languages["restored"], languages["skipped"], languages["failed"]),
+        err=True,
+    )
+    return failed_projects
+
+
 @click.group()
 def cli():
     pass
@@ -14,7 +77,7 @@ def cli():
 @click.argument(
     "project_path",
     envvar="LATEX_JI18N_PROJECT_PATH",
-    type=click.Path(exists=True),
+    type=click.Path(),
     nargs=-1,
 )
 @click.option(
@@ -23,19 +86,428 @@ def cli():
     required=False,
     type=str
 )
-def build(project_path, commands):
-    """Build with Latex the distribution files of the project located at
-    the path passed as PROJECT_PATH argument (current working directory
-    by default)."""
-    from latex_ji18n.commands.build import run
-    if not project_path:
-        project_path = os.getcwd()
-    elif isinstance(project_path, tuple):
-        project_path = project_path[0]
-    kwargs = {}
+@click.option(
+    "-j", "--jobs",
+    default=1,
+    required=False,
+    type=click.IntRange(min=0),
+    help="Number of languages built in parallel, 0 for one per CPU.",
+)
+@click.option(
+    "-f", "--force",
+    is_flag=True,
+    help="Build all the languages, even if their inputs have not changed.",
+)
+@click.option(
+    "--bytecode-cache",
+    default=None,
+    required=False,
+    type=click.Choice(["project", "user"]),
+    help="Cache the compiled templates inside the cache directory of the"
+         " project or the user.",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    required=False,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Maximum number of seconds that each command can run.",
+)
+@click.option(
+    "--preamble-cache",
+    is_flag=True,
+    help="Compile the documents using precompiled formats of their preambles.",
+)
+@click.option(
+    "--profile",
+    default=None,
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the time spent by each phase of the build to this file as"
+         " Chrome trace events.",
+)
+@click.option(
+    "--cprofile",
+    default=None,
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Profile the Python code with cProfile, writing its statistics to"
+         " this file.",
+)
+@click.option(
+    "--artifact-cache",
+    envvar="LATEX_JI18N_ARTIFACT_CACHE",
+    default=None,
+    required=False,
+    type=click.Path(file_okay=False),
+    help="Directory in which the compiled documents are cached by the content"
+         " of their inputs, which can be shared by different machines.",
+)
+@click.option(
+    "--fragment-cache",
+    default=None,
+    required=False,
+    type=click.Choice(["project", "user"]),
+    help="Store the output of the blocks cached by the 'cache' tag inside the"
+         " cache directory of the project or the user.",
+)
+@click.option(
+    "--latex-escape",
+    is_flag=True,
+    help="Escape the LaTeX special characters of the strings of the data and"
+         " i18n files, except those tagged as '!latex'.",
+)
+@click.option(
+    "--build-dir",
+    envvar="LATEX_JI18N_BUILD_DIR",
+    default=None,
+    required=False,
+    type=click.Path(file_okay=False),
+    help="Directory in which the files generated compiling each language are"
+         " written, like a tmpfs, instead of the cache directory of the project.",
+)
+def build(project_path, commands, jobs, force, bytecode_cache, timeout,
+          preamble_cache, profile, cprofile, artifact_cache, fragment_cache,
+          latex_escape, build_dir):
+    """Build with Latex the distribution files of the projects located at
+    the paths passed as PROJECT_PATH arguments (current working directory
+    by default).
+
+    Each PROJECT_PATH can be the directory of a project, a glob pattern
+    matching many of them or a file listing them, one per line. The
+    languages of all the projects are built by the same --jobs processes.
+    """
+    from latex_ji18n.commands.build import expand_project_paths, run, run_projects
+    kwargs = {
+        'jobs': jobs or os.cpu_count(),
+        'force': force,
+        'bytecode_cache': bytecode_cache,
+        'timeout': timeout,
+        'preamble_cache': preamble_cache,
+        'profile': profile,
+        'cprofile': cprofile,
+        'artifact_cache': artifact_cache and os.path.abspath(artifact_cache),
+        'fragment_cache': fragment_cache,
+        'latex_escape': latex_escape,
+        'build_dir': build_dir and os.path.abspath(build_dir),
+    }
     if commands:
         kwargs['commands'] = commands.split(',')
-    run(project_path=os.path.abspath(project_path), **kwargs)
+
+    if not project_path:
+        project_path = (os.getcwd(),)
+    if len(project_path) == 1 and os.path.isdir(project_path[0]):
+        sys.exit(run(
+            project_path=os.path.abspath(project_path[0]),
+            notify=echo_build_results,
+            **kwargs
+        ))
+
+    try:
+        project_paths = expand_project_paths(project_path)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    if not project_paths:
+        raise click.ClickException("No projects found")
+    results = run_projects(project_paths, notify=echo_build_results, **kwargs)
+    sys.exit(1 if echo_build_summary(results) else 0)
+
+
+@cli.command()
+@click.argument(
+    "project_path",
+    envvar="LATEX_JI18N_PROJECT_PATH",
+    type=click.Path(exists=True),
+    required=False,
+)
+@click.option(
+    "-c", "--commands",
+    default='pdflatex',
+    required=False,
+    type=str
+)
+@click.option(
+    "--bytecode-cache",
+    default=None,
+    required=False,
+    type=click.Choice(["project", "user"]),
+    help="Cache the compiled templates inside the cache directory of the"
+         " project or the user.",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    required=False,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Maximum number of seconds that each command can run.",
+)
+@click.option(
+    "--polling",
+    is_flag=True,
+    help="Poll the project files instead of using inotify.",
+)
+@click.option(
+    "--preamble-cache",
+    is_flag=True,
+    help="Compile the documents using precompiled formats of their preambles.",
+)
+@click.option(
+    "--latex-escape",
+    is_flag=True,
+    help="Escape the LaTeX special characters of the strings of the data and"
+         " i18n files, except those tagged as '!latex'.",
+)
+@click.option(
+    "--build-dir",
+    envvar="LATEX_JI18N_BUILD_DIR",
+    default=None,
+    required=False,
+    type=click.Path(file_okay=False),
+    help="Directory in which the files generated compiling each language are"
+         " written, like a tmpfs, instead of the cache directory of the project.",
+)
+def watch(project_path, commands, bytecode_cache, timeout, preamble_cache,
+          polling, latex_escape, build_dir):
+    """Build the project located at PROJECT_PATH (current working directory
+    by default) each time that its files change, building only the affected
+    languages."""
+    from latex_ji18n.commands.watch import run
+    try:
+        run(
+            project_path=os.path.abspath(project_path or os.getcwd()),
+            commands=commands.split(','),
+            bytecode_cache=bytecode_cache,
+            timeout=timeout,
+            preamble_cache=preamble_cache,
+            polling=polling,
+            notify=echo_build_results,
+            latex_escape=latex_escape,
+            build_dir=build_dir and os.path.abspath(build_dir),
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.argument(
+    "project_paths",
+    envvar="LATEX_JI18N_PROJECT_PATH",
+    type=click.Path(exists=True, file_okay=False),
+    nargs=-1,
+)
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8000, type=int, show_default=True)
+@click.option(
+    "-c", "--commands",
+    default='pdflatex',
+    required=False,
+    type=str
+)
+@click.option(
+    "-w", "--workers",
+    default=1,
+    type=click.IntRange(min=0),
+    help="Number of languages built at the same time, 0 for one per CPU.",
+)
+@click.option(
+    "--max-queue",
+    default=8,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Maximum number of builds waiting, more requests are rejected.",
+)
+@click.option(
+    "--max-processes",
+    default=None,
+    required=False,
+    type=click.IntRange(min=1),
+    help="Maximum number of commands executed at the same time by all the"
+         " builds, one per worker by default.",
+)
+@click.option(
+    "--bytecode-cache",
+    default=None,
+    required=False,
+    type=click.Choice(["project", "user"]),
+    help="Cache the compiled templates inside the cache directory of the"
+         " project or the user.",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    required=False,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Maximum number of seconds that each command can run.",
+)
+@click.option(
+    "--request-timeout",
+    default=None,
+    required=False,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Maximum number of seconds that a request waits for its build.",
+)
+@click.option(
+    "--preamble-cache",
+    is_flag=True,
+    help="Compile the documents using precompiled formats of their preambles.",
+)
+@click.option(
+    "--latex-escape",
+    is_flag=True,
+    help="Escape the LaTeX special characters of the strings of the data and"
+         " i18n files and of the contexts of the requests, except those tagged as"
+         " '!latex'.",
+)
+@click.option(
+    "--build-dir",
+    envvar="LATEX_JI18N_BUILD_DIR",
+    default=None,
+    required=False,
+    type=click.Path(file_okay=False),
+    help="Directory in which the files generated compiling each language are"
+         " written, like a tmpfs, instead of the cache directory of the project.",
+)
+def serve(project_paths, host, port, commands, workers, max_queue, max_processes,
+          bytecode_cache, timeout, request_timeout, preamble_cache, latex_escape,
+          build_dir):
+    """Serve the build of the projects located at PROJECT_PATHS (current
+    working directory by default) through an HTTP API."""
+    from latex_ji18n.commands.serve import run
+    click.echo("Serving at http://%s:%d" % (host, port), err=True)
+    try:
+        run(
+            [os.path.abspath(path) for path in project_paths or [os.getcwd()]],
+            host=host,
+            port=port,
+            commands=commands.split(','),
+            bytecode_cache=bytecode_cache,
+            timeout=timeout,
+            preamble_cache=preamble_cache,
+            workers=workers or os.cpu_count(),
+            max_queue=max_queue,
+            max_processes=max_processes,
+            request_timeout=request_timeout,
+            latex_escape=latex_escape,
+            build_dir=build_dir and os.path.abspath(build_dir),
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.argument("records", type=click.Path(allow_dash=True, dir_okay=False))
+@click.argument(
+    "project_path",
+    envvar="LATEX_JI18N_PROJECT_PATH",
+    type=click.Path(exists=True, file_okay=False),
+    required=False,
+)
+@click.option(
+    "-l", "--language",
+    default=None,
+    required=False,
+    help="Language of the variants, optional if the project only has one.",
+)
+@click.option(
+    "--format",
+    default=None,
+    required=False,
+    type=click.Choice(["jsonl", "csv"]),
+    help="Format of the records, guessed from the extension by default.",
+)
+@click.option(
+    "-o", "--filename-pattern",
+    default="{language}-{index}",
+    show_default=True,
+    help="Name of the documents, formatted with the variables of the records,"
+         " the language and the number of the record as 'index'.",
+)
+@click.option(
+    "-c", "--commands",
+    default='pdflatex',
+    required=False,
+    type=str
+)
+@click.option(
+    "-j", "--jobs",
+    default=1,
+    required=False,
+    type=click.IntRange(min=0),
+    help="Number of variants built in parallel, 0 for one per CPU.",
+)
+@click.option(
+    "--bytecode-cache",
+    default=None,
+    required=False,
+    type=click.Choice(["project", "user"]),
+    help="Cache the compiled templates inside the cache directory of the"
+         " project or the user.",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    required=False,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Maximum number of seconds that each command can run.",
+)
+@click.option(
+    "--preamble-cache",
+    is_flag=True,
+    help="Compile the documents using precompiled formats of their preambles.",
+)
+@click.option(
+    "--latex-escape",
+    is_flag=True,
+    help="Escape the LaTeX special characters of the strings of the data and"
+         " i18n files and of the records, except those tagged as"
+         " '!latex'.",
+)
+@click.option(
+    "--build-dir",
+    envvar="LATEX_JI18N_BUILD_DIR",
+    default=None,
+    required=False,
+    type=click.Path(file_okay=False),
+    help="Directory in which the files generated compiling each language are"
+         " written, like a tmpfs, instead of the cache directory of the project.",
+)
+def merge(records, project_path, language, format, filename_pattern, commands,
+          jobs, bytecode_cache, timeout, preamble_cache, latex_escape, build_dir):
+    """Build a variant of a language of the project located at PROJECT_PATH
+    (current working directory by default) for each record of the JSON lines
+    or CSV file RECORDS (- for the standard input), overriding the variables
+    of the language with the variables of the record."""
+    from latex_ji18n.commands.merge import read_records, run
+
+    def _notify(result, built, failed):
+        if result.returncode == 0:
+            message = "written to %s" % result.filepath
+        elif result.error is not None:
+            message = "failed: %s" % result.error
+        else:
+            message = "failed with exit status %d, see %s" % (
+                result.returncode, result.log_filepath)
+        click.echo("[%d built, %d failed] %d: %s" % (
+            built, failed, result.index, message), err=True)
+
+    try:
+        failed = run(
+            read_records(records, format=format),
+            language=language,
+            project_path=os.path.abspath(project_path or os.getcwd()),
+            filename_pattern=filename_pattern,
+            commands=commands.split(','),
+            jobs=jobs or os.cpu_count(),
+            bytecode_cache=bytecode_cache,
+            timeout=timeout,
+            preamble_cache=preamble_cache,
+            latex_escape=latex_escape,
+            build_dir=build_dir and os.path.abspath(build_dir),
+            notify=_notify,
+        )
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    sys.exit(1 if failed else 0)
 
 
 if __name__ == "__main__":
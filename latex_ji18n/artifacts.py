@@ -0,0 +1,120 @@
+"""Content addressed cache of compiled documents, which can be shared by
+different machines. Artifacts are stored by the content hash of the
+rendered template and the commands pipe that compiled it, along with the
+content hashes of the files of the project read compiling it, which must
+match to use the artifact. Each artifact contains the output document and
+the final auxiliary files.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from latex_ji18n.io import copy_file, file_md5
+from latex_ji18n.manifest import files_md5
+
+
+# changing it invalidates all the artifacts
+ARTIFACTS_VERSION = "1"
+
+DEPENDENCIES_FILENAME = "dependencies.json"
+
+
+# epoch of the metadata of the documents, like their creation date, when
+# ``SOURCE_DATE_EPOCH`` is not defined, so the same inputs produce the
+# same documents
+DEFAULT_SOURCE_DATE_EPOCH = "0"
+
+
+def source_date_epoch():
+    """Timestamp used as the date of the documents, defined explicitly by
+    the ``SOURCE_DATE_EPOCH`` environment variable, or ``None``."""
+    return os.environ.get("SOURCE_DATE_EPOCH") or None
+
+
+class ArtifactCache:
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+
+    def key(self, tex_filepath, commands, source_date_epoch=None):
+        """Key of the artifacts compiled from a rendered template. Only a
+        ``source_date_epoch`` defined explicitly changes the documents
+        compiled, so it is the only date which is part of the key."""
+        hash_md5 = hashlib.md5(ARTIFACTS_VERSION.encode())
+        hash_md5.update(file_md5(tex_filepath).encode())
+        hash_md5.update(",".join(commands).encode())
+        hash_md5.update(str(source_date_epoch).encode())
+        return hash_md5.hexdigest()
+
+    def _key_dirpath(self, key):
+        return os.path.join(self.dirpath, key[:2], key)
+
+    def lookup(self, key, project_path):
+        """Returns the directory of an artifact stored by key whose
+        dependencies have the same content in the project, or ``None``
+        if there is not such artifact."""
+        key_dirpath = self._key_dirpath(key)
+        if not os.path.isdir(key_dirpath):
+            return None
+        for dirname in sorted(os.listdir(key_dirpath)):
+            artifact_dirpath = os.path.join(key_dirpath, dirname)
+            dependencies = self.dependencies(artifact_dirpath)
+            if dependencies is None:
+                continue
+            current_dependencies = files_md5(
+                [os.path.join(project_path, relpath) for relpath in dependencies],
+                relative_to=project_path,
+            )
+            if current_dependencies == dependencies:
+                return artifact_dirpath
+        return None
+
+    def dependencies(self, artifact_dirpath):
+        """Returns the content hashes of the dependencies of an artifact, by
+        path relative to the project, or ``None`` if it is incomplete."""
+        try:
+            with open(os.path.join(artifact_dirpath, DEPENDENCIES_FILENAME),
+                      encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, dependencies, filepaths):
+        """Store the files of an artifact, by extension, with the content
+        hashes of its dependencies. Returns the directory of the artifact."""
+        hash_md5 = hashlib.md5(json.dumps(dependencies, sort_keys=True).encode())
+        artifact_dirpath = os.path.join(self._key_dirpath(key), hash_md5.hexdigest())
+        if os.path.isdir(artifact_dirpath):
+            return artifact_dirpath
+
+        # stored in a temporary directory, so other builds reading the cache
+        # at the same time don't find incomplete artifacts
+        _tmp_dirpath = "%s.%d.tmp" % (artifact_dirpath, os.getpid())
+        os.makedirs(_tmp_dirpath, exist_ok=True)
+        try:
+            for extension, filepath in filepaths.items():
+                if os.path.exists(filepath):
+                    shutil.copyfile(
+                        filepath, os.path.join(_tmp_dirpath, "artifact" + extension)
+                    )
+            with open(os.path.join(_tmp_dirpath, DEPENDENCIES_FILENAME), "w",
+                      encoding="utf-8") as f:
+                json.dump(dependencies, f, indent=2, sort_keys=True)
+            try:
+                os.rename(_tmp_dirpath, artifact_dirpath)
+            except OSError:
+                # stored by other build in the meantime
+                pass
+        finally:
+            if os.path.exists(_tmp_dirpath):
+                shutil.rmtree(_tmp_dirpath)
+        return artifact_dirpath
+
+    def restore(self, artifact_dirpath, filepaths):
+        """Copy the files of an artifact to the paths of a dictionary by
+        extension, if the artifact contains them."""
+        for extension, filepath in filepaths.items():
+            artifact_filepath = os.path.join(artifact_dirpath, "artifact" + extension)
+            if os.path.exists(artifact_filepath):
+                copy_file(artifact_filepath, filepath)
@@ -1,7 +1,70 @@
 
+import collections.abc
 import os
+import threading
 
-import bibtexparser
+from latex_ji18n import profiling
+from latex_ji18n.io import file_md5, read_pickle_file, write_pickle_file
+
+
+# changing it invalidates the entries cached on disk
+ENTRIES_CACHE_VERSION = "2"
+
+# latest entries parsed for each .bib file, by filepath: (cache key, entries)
+_entries_by_type_cache = {}
+
+# positions of the fields shared by the entries with the same fields, by the
+# names of the fields
+_shared_fields = {}
+
+
+class BibEntry(collections.abc.Mapping):
+    """Entry of a .bib file, which behaves like a read-only dictionary of its
+    fields. The names of the fields are shared by the entries with the same
+    fields, so each entry only stores its values."""
+
+    __slots__ = ("_fields", "_values")
+
+    def __init__(self, fields):
+        names = tuple(fields)
+        self._fields = _shared_fields.get(names)
+        if self._fields is None:
+            self._fields = _shared_fields.setdefault(
+                names, {name: i for i, name in enumerate(names)}
+            )
+        self._values = tuple(fields.values())
+
+    def __getitem__(self, name):
+        return self._values[self._fields[name]]
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def __repr__(self):
+        return "BibEntry(%r)" % dict(self)
+
+
+def split_names(value):
+    """Split the names of a field like ``author``, separated by ``and``
+    outside braces, normalizing their whitespace."""
+    names, words, depth = [], [], 0
+    for word in value.split():
+        if depth == 0 and word.lower() == "and":
+            if words:
+                names.append(" ".join(words))
+                words = []
+            continue
+        words.append(word)
+        depth += word.count("{") - word.count("}")
+    if words:
+        names.append(" ".join(words))
+    return names
 
 
 def get_bib_files_from_directory(dirpath):
@@ -10,16 +73,148 @@ def get_bib_files_from_directory(dirpath):
             yield fn
 
 
-def get_db_entries_by_type_from_dir_bib_files(dirpath):
+def _parse_bib_file_entries_by_type(filepath):
+    import bibtexparser
+
+    with open(filepath) as bibtex_file:
+        bib_database = bibtexparser.load(bibtex_file)
+
+    response = {}
+    for entry in bib_database.entries:
+        if entry['ENTRYTYPE'] not in response:
+            response[entry['ENTRYTYPE']] = []
+
+        response[entry['ENTRYTYPE']].append(BibEntry(entry))
+    return response
+
+
+def get_bib_file_entries_by_type(filepath, cache_dirpath=None):
+    """Parse the entries of a .bib file grouped by entry type. The result is
+    cached by the content of the file and the version of bibtexparser, both
+    in memory and, if ``cache_dirpath`` is defined, on disk.
+    """
+    import bibtexparser
+
+    key = '%s-%s-%s' % (
+        file_md5(filepath), bibtexparser.__version__, ENTRIES_CACHE_VERSION
+    )
+    _cached = _entries_by_type_cache.get(filepath)
+    if _cached is not None and _cached[0] == key:
+        return _cached[1]
+
+    response, cache_filepath = None, None
+    if cache_dirpath:
+        cache_filepath = os.path.join(cache_dirpath, '%s.pickle' % key)
+        response = read_pickle_file(cache_filepath)
+
+    if response is None:
+        response = _parse_bib_file_entries_by_type(filepath)
+        if cache_filepath:
+            write_pickle_file(cache_filepath, response)
+
+    _entries_by_type_cache[filepath] = (key, response)
+    return response
+
+
+def get_db_entries_by_type_from_dir_bib_files(dirpath, cache_dirpath=None):
     response = {}
     for fn in get_bib_files_from_directory(dirpath):
         filepath = os.path.join(dirpath, fn)
-        with open(filepath) as bibtex_file:
-            bib_database = bibtexparser.load(bibtex_file)
-
-        for entry in bib_database.entries:
-            if entry['ENTRYTYPE'] not in response:
-                response[entry['ENTRYTYPE']] = []
+        entries_by_type = get_bib_file_entries_by_type(
+            filepath, cache_dirpath=cache_dirpath
+        )
+        for entry_type, entries in entries_by_type.items():
+            if entry_type not in response:
+                response[entry_type] = []
 
-            response[entry['ENTRYTYPE']].append(entry)
+            response[entry_type].extend(entries)
     return response
+
+
+class BibDatabase(collections.abc.Mapping):
+    """Entries of .bib files grouped by entry type, also indexed by citation
+    key (``by_key``), by year (``by_year``) and by author (``by_author``).
+    The entries of each year and author are in the order of the files."""
+
+    def __init__(self, entries_by_type):
+        self.entries_by_type = entries_by_type
+        self.entries = []
+        self.by_key, self.by_year, self.by_author = {}, {}, {}
+        for entries in entries_by_type.values():
+            self.entries.extend(entries)
+        for entry in self.entries:
+            self.by_key[entry["ID"]] = entry
+            year = entry.get("year", "").strip()
+            if year:
+                self.by_year.setdefault(year, []).append(entry)
+            for author in split_names(entry.get("author", "")):
+                self.by_author.setdefault(author, []).append(entry)
+
+    def __getitem__(self, entry_type):
+        return self.entries_by_type[entry_type]
+
+    def __iter__(self):
+        return iter(self.entries_by_type)
+
+    def __len__(self):
+        return len(self.entries_by_type)
+
+
+class LazyBibDatabase(collections.abc.Mapping):
+    """:py:class:`BibDatabase` of the .bib files of a directory, which are
+    not parsed until it is accessed for the first time."""
+
+    def __init__(self, dirpath, cache_dirpath=None):
+        self.dirpath = dirpath
+        self.cache_dirpath = cache_dirpath
+        self._database = None
+        self._lock = threading.Lock()
+
+    @property
+    def database(self):
+        if self._database is None:
+            with self._lock:
+                if self._database is None:
+                    with profiling.span("LazyBibDatabase.load", "bib",
+                                        dirpath=self.dirpath):
+                        self._database = BibDatabase(
+                            get_db_entries_by_type_from_dir_bib_files(
+                                self.dirpath, cache_dirpath=self.cache_dirpath
+                            )
+                        )
+        return self._database
+
+    def reset(self):
+        """Discard the parsed database, so the .bib files are parsed again
+        the next time it is accessed."""
+        with self._lock:
+            self._database = None
+
+    @property
+    def entries_by_type(self):
+        return self.database.entries_by_type
+
+    @property
+    def entries(self):
+        return self.database.entries
+
+    @property
+    def by_key(self):
+        return self.database.by_key
+
+    @property
+    def by_year(self):
+        return self.database.by_year
+
+    @property
+    def by_author(self):
+        return self.database.by_author
+
+    def __getitem__(self, entry_type):
+        return self.entries_by_type[entry_type]
+
+    def __iter__(self):
+        return iter(self.entries_by_type)
+
+    def __len__(self):
+        return len(self.entries_by_type)
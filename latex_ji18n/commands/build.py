@@ -3,20 +3,964 @@ called a commands pipe, for example `pdflatex && bibtex && pdflatex`.
 If a command in the PIPE fails, the execution is stopped.
 
 Can be built using different commands pipes. If the latest command
-in the pipe is `pdflatex`, will be ran
-until the `.aux` file doesn't change, specifing a maximum times
-that the execution will be repeated until a failure is raised.
+in the pipe is `pdflatex`, will be ran until the auxiliary files don't
+change and the log doesn't ask for another run, specifing a maximum
+times that the execution will be repeated. `biber` is only ran when
+the `.bcf` file written by `pdflatex` or the `.bib` files listed by it
+change, and the `pdflatex` runs following a skipped `biber` run are only
+executed if the previous run needs another one.
+
+Each language is built by its own pipe, writing the files generated to
+its own build directory, which keeps the auxiliary files of its latest
+successful build so the next build starts from them. Languages can be
+built in parallel by a pool of processes, scheduling first the languages
+which are more expensive to build. When the languages are built by a
+single process, the template is rendered for all of them, by a pool of
+threads, before compiling them. The languages of many projects can be
+built by the same pool, whose processes share the data files parsed and
+the templates compiled between projects.
+
+The content hashes of the inputs of each language and of the files
+read by `pdflatex` (recorded with its `-recorder` option) and `biber`
+(the data sources listed by the `.bcf` file) are stored in a build
+manifest after a successful build, so languages whose inputs have not
+changed since are skipped.
+
+Compiled documents can be stored in an artifact cache, shared by
+different machines, and restored from it instead of compiling them when
+the rendered template, the commands pipe and the files read compiling
+them have not changed.
+
+Builds can be profiled, recording the time spent by each phase of the
+build of each language as Chrome trace events.
 """
 
+import asyncio
+import concurrent.futures
+import glob
+import hashlib
+import inspect
 import os
-import sys
 
+from latex_ji18n import profiling
+from latex_ji18n.artifacts import (
+    DEFAULT_SOURCE_DATE_EPOCH,
+    ArtifactCache,
+    source_date_epoch
+)
+from latex_ji18n.biber import get_bib_files_from_directory
+from latex_ji18n.config import Config, user_cache_dirpath
 from latex_ji18n.context import LanguageContext, ProjectContext
 from latex_ji18n.environment import LatexJinja2Environment
-from latex_ji18n.executable import executables
+from latex_ji18n.executable import ExecutionEngine, executables
 from latex_ji18n.filters import DEFAULT_FILTERS
-from latex_ji18n.io import file_md5
+from latex_ji18n.io import copy_file, move_file
+from latex_ji18n.manifest import MANIFEST_FILENAME, BuildManifest, files_md5
+from latex_ji18n.preamble import PreambleFormatCache, split_preamble
+from latex_ji18n.recorder import read_recorder_file
 from latex_ji18n.render import LatexJinja2Renderer
+from latex_ji18n.rerun import AUXILIARY_EXTENSIONS, RerunPlanner, bcf_datasources
+
+
+# auxiliary files of the latest successful build of each language, with the
+# state of biber, stored in a directory inside its build directory
+WARM_EXTENSIONS = AUXILIARY_EXTENSIONS + (".bcf", ".bcf.md5")
+WARM_DIRNAME = "warm"
+
+
+class BuildResult:
+    """Result of building a language."""
+
+    def __init__(
+        self,
+        language,
+        returncode=0,
+        skipped=False,
+        inputs=None,
+        dependencies=None,
+        log_filepath=None,
+        error=None,
+        cached=False,
+    ):
+        self.language = language
+        self.returncode = returncode
+        self.skipped = skipped
+        self.inputs = inputs
+        self.dependencies = dependencies
+        self.log_filepath = log_filepath
+
+        # exception raised rendering the template or, when built by other
+        # process, building the language
+        self.error = error
+
+        # restored from the artifact cache
+        self.cached = cached
+
+        # profile of the build when built by other process
+        self.spans = []
+        self.cprofile_stats = None
+
+
+class ProjectBuilder:
+    """Builds the languages of a project. The builder keeps the project
+    context and the renderer between builds of different languages.
+
+    If ``bytecode_cache`` is ``"project"`` or ``"user"``, the compiled
+    templates are cached on disk inside the cache directory of the project
+    or the user, respectively. Any other value is used as the path to the
+    cache directory. It only takes effect if ``environment`` is a class. The
+    same applies to ``fragment_cache``, which stores on disk the output of
+    the blocks of the templates cached by the ``cache`` tag.
+
+    The commands are killed if they don't finish in ``timeout`` seconds and
+    no more than ``max_processes`` commands are executed at the same time.
+    An ``engine`` can be passed instead to share that limit between the
+    builders of different projects.
+
+    If ``preamble_cache`` is ``True``, the preambles of the rendered
+    templates are dumped into format files cached inside the cache
+    directory of the project, which are used to compile them.
+
+    If ``latex_escape`` is ``True``, the LaTeX special characters of the
+    strings of the data and i18n files are escaped when they are loaded.
+
+    The files generated building each language are written to a directory
+    inside the cache directory of the project or, if ``build_dir`` is
+    defined, inside that directory, which can be in other filesystem, like
+    a tmpfs.
+
+    If ``artifact_cache`` is defined, the compiled documents are stored in
+    that directory and restored from it when possible. Documents are dated
+    by ``SOURCE_DATE_EPOCH`` if it is defined, otherwise their metadata is
+    dated by a fixed epoch, so they are reproducible.
+
+    A ``renderer`` created by other builder with the same ``environment``,
+    ``filters`` and caches can be passed to share the compiled templates.
+    """
+
+    def __init__(
+        self,
+        project_path=None,
+        environment=LatexJinja2Environment,
+        filters=DEFAULT_FILTERS,
+        commands=["pdflatex"],
+        max_runs=4,
+        bytecode_cache=None,
+        timeout=None,
+        max_processes=1,
+        preamble_cache=False,
+        artifact_cache=None,
+        fragment_cache=None,
+        latex_escape=False,
+        build_dir=None,
+        renderer=None,
+        engine=None,
+    ):
+        if not project_path:
+            project_path = os.getcwd()
+
+        for command in commands:
+            if command not in executables:
+                raise ValueError(
+                    '\'%s\' command is not a valid latex-ji18n executable' %
+                    command)
+
+        # arguments needed to create the same builder in other processes
+        self.kwargs = {
+            "project_path": project_path,
+            "environment": environment,
+            "filters": filters,
+            "commands": commands,
+            "max_runs": max_runs,
+            "bytecode_cache": bytecode_cache,
+            "timeout": timeout,
+            "max_processes": max_processes,
+            "preamble_cache": preamble_cache,
+            "artifact_cache": artifact_cache,
+            "fragment_cache": fragment_cache,
+            "latex_escape": latex_escape,
+            "build_dir": build_dir,
+        }
+
+        self.commands = commands
+        self.max_runs = max_runs
+
+        # options which change the output of the languages, stored in the
+        # build manifest
+        self.options = {"latex_escape": latex_escape}
+        self.engine = engine
+        if self.engine is None:
+            self.engine = ExecutionEngine(
+                max_processes=max_processes, timeout=timeout
+            )
+        self.reset_project_context()
+
+        self.renderer = renderer
+        if self.renderer is None:
+            if (bytecode_cache or fragment_cache) and inspect.isclass(environment):
+                environment_kwargs = {}
+                if bytecode_cache:
+                    environment_kwargs["bytecode_cache_dirpath"] = (
+                        self._cache_dirpath(bytecode_cache, "jinja2")
+                    )
+                if fragment_cache:
+                    environment_kwargs["fragment_cache_dirpath"] = (
+                        self._cache_dirpath(fragment_cache, "fragments")
+                    )
+                environment = environment(**environment_kwargs)
+            self.renderer = LatexJinja2Renderer(
+                environment=environment, filters=filters
+            )
+
+        self.manifest = BuildManifest(
+            os.path.join(self.project_context.cache_dirpath, MANIFEST_FILENAME)
+        )
+
+        self.preamble_cache = None
+        if preamble_cache:
+            self.preamble_cache = PreambleFormatCache(
+                os.path.join(self.project_context.cache_dirpath, "formats")
+            )
+
+        self.artifact_cache, self.source_date_epoch = None, None
+        if artifact_cache:
+            self.artifact_cache = ArtifactCache(artifact_cache)
+            self.source_date_epoch = source_date_epoch()
+
+    def _cache_dirpath(self, cache, dirname):
+        if cache == "project":
+            return os.path.join(self.project_context.cache_dirpath, dirname)
+        elif cache == "user":
+            return os.path.join(user_cache_dirpath(), dirname)
+        return cache
+
+    def reset_project_context(self):
+        """Create the project context again, discarding the loaded data."""
+        self.project_context = ProjectContext(
+            project_path=self.kwargs["project_path"],
+            config=Config(latex_escape=self.kwargs["latex_escape"]),
+        )
+        self.project_context._prepare()
+
+    def discover_languages(self):
+        return list(self.project_context.discover_languages())
+
+    def build_dirpath(self, language):
+        """Directory in which the files generated by the command pipe of a
+        language are written, inside the cache directory of the project or,
+        if ``build_dir`` is defined, inside a directory of the project in
+        ``build_dir``."""
+        build_dir = self.kwargs["build_dir"]
+        if not build_dir:
+            return os.path.join(self.project_context.cache_dirpath, "build", language)
+        project_path = self.project_context.project_path
+        return os.path.join(
+            build_dir,
+            "%s-%s" % (
+                os.path.basename(project_path),
+                hashlib.md5(project_path.encode("utf-8")).hexdigest()[:8],
+            ),
+            language,
+        )
+
+    def command_env(self, language):
+        """Environment of the commands of a language. The files of its build
+        directory are found by LaTeX before the files of the source
+        directory, in which the commands are executed."""
+        env = dict(
+            os.environ,
+            TEXINPUTS=self.build_dirpath(language) + os.pathsep + os.environ.get(
+                "TEXINPUTS", ""
+            ),
+        )
+        if self.source_date_epoch is not None:
+            # 'FORCE_SOURCE_DATE' also dates '\today' by 'SOURCE_DATE_EPOCH'
+            env["SOURCE_DATE_EPOCH"] = self.source_date_epoch
+            env["FORCE_SOURCE_DATE"] = "1"
+        elif self.artifact_cache is not None:
+            # only the metadata of the documents is dated by a fixed epoch,
+            # '\today' is still the date of the build
+            env["SOURCE_DATE_EPOCH"] = DEFAULT_SOURCE_DATE_EPOCH
+        return env
+
+    def save_warm_files(self, language):
+        """Keep a copy of the auxiliary files of the latest successful build
+        of a language, so the next build starts from them even if other
+        build fails in the meantime."""
+        build_dirpath = self.build_dirpath(language)
+        warm_dirpath = os.path.join(build_dirpath, WARM_DIRNAME)
+        if not os.path.exists(warm_dirpath):
+            os.makedirs(warm_dirpath, exist_ok=True)
+        for extension in WARM_EXTENSIONS:
+            filepath = os.path.join(build_dirpath, language + extension)
+            warm_filepath = os.path.join(warm_dirpath, language + extension)
+            if os.path.exists(filepath):
+                copy_file(filepath, warm_filepath)
+            elif os.path.exists(warm_filepath):
+                os.remove(warm_filepath)
+
+    def restore_warm_files(self, language):
+        """Restore the auxiliary files of the latest successful build of a
+        language after a failed build, which can leave them incomplete."""
+        build_dirpath = self.build_dirpath(language)
+        warm_dirpath = os.path.join(build_dirpath, WARM_DIRNAME)
+        for extension in WARM_EXTENSIONS:
+            filepath = os.path.join(build_dirpath, language + extension)
+            warm_filepath = os.path.join(warm_dirpath, language + extension)
+            if os.path.exists(warm_filepath):
+                copy_file(warm_filepath, filepath)
+            elif os.path.exists(filepath):
+                os.remove(filepath)
+
+    def log_filepath(self, language):
+        """File in which the output of the commands of a language is logged."""
+        return os.path.join(
+            self.project_context.cache_dirpath, "logs", "%s.log" % language
+        )
+
+    def output_filename(self, language):
+        return "%s%s" % (language, executables[self.commands[-1]].output_extension)
+
+    def language_inputs(self, language_context):
+        """Returns the content hashes of the input files of a language,
+        which are the template and the templates included by it, the data
+        files, the i18n files, the bibliography files and the rendered
+        template.
+        """
+        project_context = self.project_context
+        filepaths = self.renderer.template_filepaths(
+            project_context.template_filepath
+        )
+        for meta_prop in (
+            "data_filepath",
+            "layout_filepath",
+            "style_filepath",
+            "data_private_filepath",
+            "layout_private_filepath",
+            "style_private_filepath",
+        ):
+            filepath = project_context._get_meta(meta_prop)
+            if filepath:
+                filepaths.append(filepath)
+
+        filepaths.append(language_context.filepath)
+        i18n_private_dirpath = project_context._get_meta("i18n_private_dirpath")
+        if i18n_private_dirpath:
+            filepaths.append(os.path.join(
+                i18n_private_dirpath,
+                "%s.yml" % language_context._get_meta("language"),
+            ))
+
+        source_dirpath = project_context.source_dirpath
+        for fn in sorted(get_bib_files_from_directory(source_dirpath)):
+            filepaths.append(os.path.join(source_dirpath, fn))
+
+        filepaths.append(language_context.localized_tex_filepath)
+        return files_md5(filepaths, relative_to=project_context.project_path)
+
+    def language_dependencies(self, language, filepaths):
+        """Returns the content hashes of the files of the project read by
+        LaTeX compiling a language."""
+        project_path = self.project_context.project_path
+        return files_md5(
+            [
+                filepath for filepath in filepaths
+                if filepath.startswith(project_path + os.sep)
+            ],
+            relative_to=project_path,
+        )
+
+    def recorded_dependencies(self, language):
+        """Returns the paths of the files of the project read by LaTeX in the
+        latest compilation of a language, including those read dumping the
+        format of its preamble and, as biber is not recorded, the data
+        sources of biber listed by the ``.bcf`` file."""
+        response = []
+        for extension in (".fls", ".preamble.fls"):
+            fls_filepath = os.path.join(self.build_dirpath(language),
+                                        language + extension)
+            if os.path.exists(fls_filepath):
+                response.extend(read_recorder_file(fls_filepath))
+
+        bcf_filepath = os.path.join(self.build_dirpath(language),
+                                    language + ".bcf")
+        if "biber" in self.commands and os.path.exists(bcf_filepath):
+            source_dirpath = self.project_context.source_dirpath
+            for datasource in bcf_datasources(bcf_filepath):
+                filepath = os.path.join(source_dirpath, datasource)
+                if os.path.isfile(filepath):
+                    response.append(os.path.abspath(filepath))
+        return response
+
+    def estimate_cost(self, language):
+        """Estimate the relative cost of building a language, which is the
+        size of its latest distributed output or, if it has not been built
+        yet, the size of its i18n files.
+        """
+        dist_filepath = os.path.join(
+            self.project_context.dist_dirpath, self.output_filename(language)
+        )
+        if os.path.exists(dist_filepath):
+            return os.path.getsize(dist_filepath)
+
+        cost = 0
+        for meta_prop in ("i18n_dirpath", "i18n_private_dirpath"):
+            dirpath = self.project_context._get_meta(meta_prop)
+            if dirpath:
+                filepath = os.path.join(dirpath, "%s.yml" % language)
+                if os.path.exists(filepath):
+                    cost += os.path.getsize(filepath)
+        return cost
+
+    def language_context_to_build(self, language, force=False):
+        """Returns the prepared context of a language, or ``None`` if its
+        inputs have not changed since its latest build and ``force`` is
+        ``False``."""
+        language_context = LanguageContext(
+            language=language, project_context=self.project_context
+        )
+        language_context._prepare()
+        if force:
+            return language_context
+
+        dist_filepath = os.path.join(self.project_context.dist_dirpath,
+                                     self.output_filename(language))
+        inputs = self.language_inputs(language_context)
+        dependencies = self.language_dependencies(language, [
+            os.path.join(self.project_context.project_path, filepath)
+            for filepath in self.manifest.dependencies(language)
+        ])
+        if self.manifest.is_up_to_date(
+            language,
+            inputs,
+            self.commands,
+            dist_filepath,
+            dependencies,
+            options=self.options,
+        ):
+            return None
+        return language_context
+
+    def expose_bibdb(self):
+        """Don't expose the bib databases if the template doesn't use them,
+        so they are not parsed."""
+        bibdb_variable_name = self.project_context._get_meta("bibdb_variable_name")
+        variables = self.renderer.undeclared_variables(
+            self.project_context.template_filepath
+        )
+        if variables is not None and bibdb_variable_name not in variables:
+            self.project_context.pop(bibdb_variable_name, None)
+        else:
+            self.project_context[bibdb_variable_name] = self.project_context.bibdb
+
+    def build_language(self, language, force=False):
+        """Render and compile a language of the project, unless its inputs
+        have not changed since its latest build and ``force`` is ``False``.
+        """
+        with profiling.span("build_language", language=language) as args:
+            language_context = self.language_context_to_build(language, force=force)
+            if language_context is None:
+                result = BuildResult(language, skipped=True)
+            else:
+                with profiling.span(
+                    "LanguageContext.load", "context", language=language
+                ):
+                    language_context.load()
+                self.expose_bibdb()
+                try:
+                    self.renderer.stream(
+                        self.project_context.template_filepath,
+                        language_context.localized_tex_filepath,
+                        context=language_context,
+                    )
+                except Exception as exc:
+                    result = BuildResult(language, returncode=1, error=exc)
+                else:
+                    result = self.compile_language_to_dist(language_context)
+            args["skipped"] = result.skipped
+            args["returncode"] = result.returncode
+        return result
+
+    def build_languages(self, languages, force=False):
+        """Build some languages of the project, rendering all of them before
+        compiling them, in order. Returns the :py:class:`BuildResult` of
+        each language, by language."""
+        results, language_contexts = {}, {}
+        for language in languages:
+            language_context = self.language_context_to_build(language, force=force)
+            if language_context is None:
+                results[language] = BuildResult(language, skipped=True)
+                continue
+            with profiling.span("LanguageContext.load", "context", language=language):
+                language_context.load()
+            language_contexts[language] = language_context
+
+        if language_contexts:
+            self.expose_bibdb()
+            errors = self.renderer.render_many(
+                self.project_context.template_filepath, language_contexts
+            )
+            for language, exc in errors.items():
+                results[language] = BuildResult(language, returncode=1, error=exc)
+
+        for language, language_context in language_contexts.items():
+            if language not in results:
+                with profiling.span("build_language", language=language) as args:
+                    results[language] = self.compile_language_to_dist(
+                        language_context
+                    )
+                    args["returncode"] = results[language].returncode
+        return results
+
+    def artifact_dependencies(self, language, dependencies):
+        """Filter the dependencies of a language which are stored with its
+        artifacts, excluding the files generated building it."""
+        generated_prefix = os.path.relpath(
+            self.build_dirpath(language), self.project_context.project_path
+        ) + os.sep
+        cache_prefix = os.path.relpath(
+            self.project_context.cache_dirpath, self.project_context.project_path
+        ) + os.sep
+        return {
+            relpath: md5 for relpath, md5 in dependencies.items()
+            if not relpath.startswith((generated_prefix, cache_prefix))
+        }
+
+    def artifact_filepaths(self, language):
+        """Files of a language stored in its artifacts, by extension."""
+        build_dirpath = self.build_dirpath(language)
+        output_extension = executables[self.commands[-1]].output_extension
+        return {
+            extension: os.path.join(build_dirpath, language + extension)
+            for extension in (output_extension, ".aux", ".bbl")
+        }
+
+    def restore_artifact(self, language_context):
+        """Copy the artifacts of a language compiled with the same inputs to
+        the build and distribution directories, if they are cached. Returns
+        the :py:class:`BuildResult` of the language or ``None`` if its
+        artifacts are not cached."""
+        language = language_context._get_meta("language")
+        project_path = self.project_context.project_path
+        key = self.artifact_cache.key(
+            language_context.localized_tex_filepath,
+            self.commands,
+            source_date_epoch=self.source_date_epoch,
+        )
+        artifact_dirpath = self.artifact_cache.lookup(key, project_path)
+        if artifact_dirpath is None:
+            return None
+
+        with profiling.span("ArtifactCache.restore", "artifacts",
+                            language=language):
+            if not os.path.exists(self.build_dirpath(language)):
+                os.makedirs(self.build_dirpath(language), exist_ok=True)
+            filepaths = self.artifact_filepaths(language)
+            output_extension = executables[self.commands[-1]].output_extension
+            filepaths[output_extension] = os.path.join(
+                self.project_context.dist_dirpath, self.output_filename(language)
+            )
+            self.artifact_cache.restore(artifact_dirpath, filepaths)
+
+        log_filepath = self.log_filepath(language)
+        if not os.path.exists(os.path.dirname(log_filepath)):
+            os.makedirs(os.path.dirname(log_filepath), exist_ok=True)
+        with open(log_filepath, "w", encoding="utf-8") as f:
+            f.write("latex-ji18n: restored from '%s'\n" % artifact_dirpath)
+
+        dependencies = self.artifact_cache.dependencies(artifact_dirpath)
+        return BuildResult(
+            language,
+            inputs=self.language_inputs(language_context),
+            dependencies=self.language_dependencies(language, [
+                os.path.join(project_path, relpath) for relpath in dependencies
+            ]),
+            log_filepath=log_filepath,
+            cached=True,
+        )
+
+    def store_artifact(self, language_context, dependencies):
+        language = language_context._get_meta("language")
+        with profiling.span("ArtifactCache.store", "artifacts", language=language):
+            self.artifact_cache.store(
+                self.artifact_cache.key(
+                    language_context.localized_tex_filepath,
+                    self.commands,
+                    source_date_epoch=self.source_date_epoch,
+                ),
+                self.artifact_dependencies(language, dependencies),
+                self.artifact_filepaths(language),
+            )
+
+    def compile_language_to_dist(self, language_context):
+        """Compile the rendered template of a language, moving the output to
+        the distribution directory if succeeded. If the artifacts of the
+        language are cached, they are restored instead of compiling it."""
+        language = language_context._get_meta("language")
+        if self.artifact_cache is not None:
+            result = self.restore_artifact(language_context)
+            if result is not None:
+                return result
+
+        returncode = asyncio.run(self.compile_language(language_context))
+        output_filename = self.output_filename(language)
+        expected_filepath = os.path.join(self.build_dirpath(language),
+                                         output_filename)
+        if returncode == 0 and not os.path.exists(expected_filepath):
+            returncode = 1
+        if returncode != 0:
+            self.restore_warm_files(language)
+            return BuildResult(
+                language,
+                returncode=returncode,
+                log_filepath=self.log_filepath(language),
+            )
+        self.save_warm_files(language)
+
+        dependencies = self.language_dependencies(
+            language, self.recorded_dependencies(language)
+        )
+        if self.artifact_cache is not None:
+            self.store_artifact(language_context, dependencies)
+
+        move_file(
+            expected_filepath,
+            os.path.join(self.project_context.dist_dirpath, output_filename),
+        )
+        return BuildResult(
+            language,
+            inputs=self.language_inputs(language_context),
+            dependencies=dependencies,
+            log_filepath=self.log_filepath(language),
+        )
+
+    async def preamble_format(self, tex_filepath, build_dirpath, jobname,
+                              log_filepath):
+        """Get the precompiled format of the preamble of a rendered template,
+        writing its body to another file of the build directory which can be
+        compiled using that format. Returns the name of the format and the
+        path of the body file, or ``None`` for both if the format can't be
+        dumped.
+
+        The files of the project read dumping the format are not read again
+        compiling the body, so they are recorded in the file
+        ``{jobname}.preamble.fls`` of the build directory.
+        """
+        with open(tex_filepath, encoding="utf-8") as f:
+            parts = split_preamble(f.read())
+        if parts is None:
+            return None, None
+        preamble, body = parts
+
+        project_path = self.project_context.project_path
+        fmt = await self.preamble_cache.aget(
+            preamble,
+            executables['pdflatex'](engine=self.engine),
+            cwd=self.project_context.source_dirpath,
+            log_filepath=log_filepath,
+            root_dirpath=project_path,
+        )
+        if fmt is None:
+            return None, None
+
+        preamble_fls_filepath = os.path.join(
+            build_dirpath, "%s.preamble.fls" % jobname
+        )
+        with open(preamble_fls_filepath, "w", encoding="utf-8") as f:
+            f.write("PWD %s\n" % project_path)
+            for relpath in self.preamble_cache.dependencies(fmt, project_path):
+                f.write("INPUT %s\n" % relpath)
+
+        body_filepath = os.path.join(build_dirpath, '%s.body.tex' % jobname)
+        with open(body_filepath, "w", encoding="utf-8") as f:
+            f.write(body)
+        return fmt, body_filepath
+
+    async def compile_language(self, language_context, jobname=None):
+        """Execute the commands pipe of a language, writing their output to
+        the log file of the language. Returns the exit status of the pipe.
+
+        The commands are executed in the source directory, so the files of
+        the project are found as usual, writing the files generated to the
+        build directory of the language.
+
+        If ``jobname`` is defined, compiles the file ``{jobname}.tex`` of the
+        build directory instead of the rendered template of the language,
+        naming the files generated and the log file after it.
+        """
+        language = language_context._get_meta("language")
+        source_dirpath = self.project_context.source_dirpath
+        build_dirpath = self.build_dirpath(language)
+        if not os.path.exists(build_dirpath):
+            os.makedirs(build_dirpath, exist_ok=True)
+        if jobname is None:
+            jobname = language
+            tex_filepath = language_context.localized_tex_filepath
+        else:
+            tex_filepath = os.path.join(build_dirpath, "%s.tex" % jobname)
+
+        log_filepath = self.log_filepath(jobname)
+        if not os.path.exists(os.path.dirname(log_filepath)):
+            os.makedirs(os.path.dirname(log_filepath), exist_ok=True)
+        open(log_filepath, "wb").close()
+
+        preamble_fls_filepath = os.path.join(
+            build_dirpath, "%s.preamble.fls" % jobname
+        )
+        if os.path.exists(preamble_fls_filepath):
+            os.remove(preamble_fls_filepath)
+        fmt, body_filepath = None, None
+        if self.preamble_cache is not None:
+            fmt, body_filepath = await self.preamble_format(
+                tex_filepath, build_dirpath, jobname, log_filepath
+            )
+
+        env = self.command_env(language)
+
+        async def _run(command):
+            nonlocal fmt
+            executable = executables[command](engine=self.engine)
+            if command != 'pdflatex':
+                return await executable.arun(
+                    jobname, cwd=source_dirpath, log_filepath=log_filepath,
+                    env=env, output_dirpath=build_dirpath)
+            if fmt:
+                returncode = await executable.arun(
+                    body_filepath,
+                    cwd=source_dirpath,
+                    log_filepath=log_filepath,
+                    env=self.preamble_cache.env(env),
+                    fmt=fmt,
+                    jobname=jobname,
+                    output_dirpath=build_dirpath,
+                )
+                if returncode == 0:
+                    return returncode
+                # the document can't be compiled using the format
+                fmt = None
+            return await executable.arun(
+                tex_filepath,
+                cwd=source_dirpath,
+                log_filepath=log_filepath,
+                env=env,
+                jobname=jobname,
+                output_dirpath=build_dirpath,
+            )
+
+        planner = RerunPlanner(build_dirpath, jobname, source_dirpath)
+        # the pdflatex runs following a skipped biber run are skipped too,
+        # unless the previous run needs another one
+        pdflatex_ran, biber_skipped = False, False
+        for command in self.commands:
+            if command == 'biber' and planner.biber_is_up_to_date():
+                biber_skipped = True
+                continue
+            if command == 'pdflatex':
+                if (
+                    pdflatex_ran
+                    and biber_skipped
+                    and not planner.needs_rerun()
+                    and not planner.needs_biber()
+                ):
+                    continue
+                planner.snapshot()
+            returncode = await _run(command)
+            if returncode != 0:
+                return returncode
+            if command == 'pdflatex':
+                pdflatex_ran = True
+            elif command == 'biber':
+                planner.biber_ran()
+                biber_skipped = False
+
+        if self.commands[-1] == 'pdflatex':
+            n_runs = 0
+            for command in reversed(self.commands):
+                n_runs += 1
+                if command != 'pdflatex':
+                    break
+            for nrun in range(self.max_runs - n_runs):
+                needs_biber = 'biber' in self.commands and planner.needs_biber()
+                if not needs_biber and not planner.needs_rerun():
+                    break
+                if needs_biber:
+                    returncode = await _run('biber')
+                    if returncode != 0:
+                        return returncode
+                    planner.biber_ran()
+                planner.snapshot()
+                returncode = await _run('pdflatex')
+                if returncode != 0:
+                    return returncode
+        return 0
+
+
+# builders created by each process of a pool, by their arguments
+_builders = {}
+
+# renderers shared by the builders of different projects created by each
+# process of a pool, so they share the compiled templates, by the arguments
+# which define them
+_renderers = {}
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(value[key])) for key in value))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _renderer_key(builder_kwargs):
+    # the disk caches inside each project can't be shared
+    caches = (
+        builder_kwargs.get("bytecode_cache"),
+        builder_kwargs.get("fragment_cache"),
+    )
+    if "project" in caches:
+        return None
+    return _hashable((
+        builder_kwargs.get("environment", LatexJinja2Environment),
+        builder_kwargs.get("filters", DEFAULT_FILTERS),
+        caches,
+    ))
+
+
+def create_builder(renderers, **builder_kwargs):
+    """Create the builder of a project, sharing the renderer of the builders
+    of other projects created with the same arguments, which is stored in
+    the dictionary ``renderers``."""
+    key = _renderer_key(builder_kwargs)
+    builder = ProjectBuilder(renderer=renderers.get(key), **builder_kwargs)
+    if key is not None:
+        renderers.setdefault(key, builder.renderer)
+    return builder
+
+
+def project_builder(**builder_kwargs):
+    """Returns the builder of a project created by this process of a pool
+    with the same arguments, creating it if needed. It must only be used by
+    the processes of a pool, which live as long as a build, as the builders
+    keep the data files loaded."""
+    key = _hashable(builder_kwargs)
+    if key not in _builders:
+        _builders[key] = create_builder(_renderers, **builder_kwargs)
+    return _builders[key]
+
+
+def _build_language_job(builder_kwargs, language, force=False, profile=False,
+                        cprofile=False):
+    profiler = None
+    if profile:
+        profiler = profiling.Profiler(cprofile=cprofile)
+        profiler.enable()
+    try:
+        builder = project_builder(**builder_kwargs)
+        result = builder.build_language(language, force=force)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+    if profiler is not None:
+        result.spans = profiler.spans
+        result.cprofile_stats = profiler.cprofile_stats()
+    return result
+
+
+def _save_results(builder, results):
+    """Store the inputs of the languages built in the build manifest."""
+    for result in results.values():
+        if result.skipped:
+            continue
+        if result.returncode == 0:
+            builder.manifest.update(
+                result.language,
+                result.inputs,
+                builder.commands,
+                dependencies=result.dependencies,
+                options=builder.options,
+            )
+        else:
+            builder.manifest.discard(result.language)
+    builder.manifest.save()
+
+
+def schedule_many(projects, jobs=1, force=False):
+    """Build the languages of many projects, defined as pairs of a builder
+    and its languages, using a single pool of ``jobs`` processes, starting
+    by the most expensive languages of all of them, and store the inputs of
+    the built languages in the build manifest of each project. Returns a
+    dictionary by project path with the :py:class:`BuildResult` of each
+    language by language or, if a project can't be built, the exception
+    raised.
+
+    If a profiler is enabled, the languages built by other processes are
+    profiled too.
+    """
+    profiler = profiling.enabled_profiler()
+    results = {}
+    builders = {}
+    queue = []
+    for builder, languages in projects:
+        project_path = builder.project_context.project_path
+        builders[project_path] = builder
+        results[project_path] = {}
+        queue.extend(
+            (builder.estimate_cost(language), project_path, language)
+            for language in languages
+        )
+
+    if jobs <= 1 or len(queue) <= 1:
+        for builder, languages in projects:
+            project_path = builder.project_context.project_path
+            languages = sorted(languages, key=builder.estimate_cost, reverse=True)
+            try:
+                results[project_path] = builder.build_languages(
+                    languages, force=force
+                )
+            except Exception as exc:
+                results[project_path] = exc
+    else:
+        queue.sort(key=lambda job: job[0], reverse=True)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(
+                    _build_language_job,
+                    builders[project_path].kwargs,
+                    language,
+                    force=force,
+                    profile=profiler is not None,
+                    cprofile=profiler is not None and profiler.cprofile is not None,
+                ): (project_path, language)
+                for _, project_path, language in queue
+            }
+            for future in concurrent.futures.as_completed(futures):
+                project_path, language = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    # a project which fails doesn't stop the others
+                    result = BuildResult(language, returncode=1, error=exc)
+                results[project_path][language] = result
+                if profiler is not None:
+                    profiler.record(result.spans, stats=result.cprofile_stats)
+
+    for project_path, builder in builders.items():
+        if not isinstance(results[project_path], Exception):
+            _save_results(builder, results[project_path])
+    return results
+
+
+def schedule(builder, languages, jobs=1, force=False):
+    """Build the languages of a project using ``jobs`` processes, like
+    :py:func:`schedule_many`. Returns a dictionary with the
+    :py:class:`BuildResult` of each language."""
+    results = schedule_many([(builder, languages)], jobs=jobs, force=force)
+    results = results[builder.project_context.project_path]
+    if isinstance(results, Exception):
+        raise results
+    return results
 
 
 def run(
@@ -26,76 +970,182 @@ def run(
     filters=DEFAULT_FILTERS,
     commands=["pdflatex"],
     max_runs=4,
+    jobs=1,
+    force=False,
+    bytecode_cache=None,
+    timeout=None,
+    preamble_cache=False,
+    notify=None,
+    profile=None,
+    cprofile=None,
+    artifact_cache=None,
+    fragment_cache=None,
+    latex_escape=False,
+    build_dir=None,
 ):
-    if not project_path:
-        project_path = os.getcwd()
+    """Build the languages of a project, returning the first non zero exit
+    status of their commands pipes or ``0`` if all of them succeeded.
+    Languages whose inputs have not changed are not built again unless
+    ``force`` is ``True``.
 
-    renderer = LatexJinja2Renderer(environment=environment, filters=filters)
-    project_context = ProjectContext(project_path=project_path)
-    project_context._prepare()
-    template_filepath = project_context.template_filepath
+    When ``jobs`` is greater than 1 the languages are built in parallel, so
+    ``environment`` and ``filters`` must be picklable. If ``notify`` is
+    defined, is called with the :py:class:`BuildResult` of each language.
 
-    if languages is None:
-        languages = project_context.discover_languages()
-    for language in languages:
-        # Load context
-        language_context = LanguageContext(
-            language=language, project_context=project_context
-        )
-        language_context.load()
+    If ``profile`` is defined, the phases of the build are written to that
+    file as Chrome trace events. If ``cprofile`` is defined, the Python code
+    executed is profiled and its statistics are written to that file.
+
+    If ``artifact_cache`` is defined, the compiled documents are stored in
+    that directory and copied from it instead of compiling them when the
+    rendered template, the commands pipe and the files read compiling them
+    have not changed.
 
-        # Render template to localized output
-        renderer.render(
-            template_filepath,
-            context=language_context,
-            destpath=language_context.localized_tex_filepath,
+    If ``fragment_cache`` is defined, the output of the blocks of the
+    templates cached by the ``cache`` tag is stored on disk, like
+    ``bytecode_cache``.
+    """
+    profiler = None
+    if profile or cprofile:
+        profiler = profiling.Profiler(cprofile=bool(cprofile))
+        profiler.enable()
+    try:
+        builder = ProjectBuilder(
+            project_path=project_path,
+            environment=environment,
+            filters=filters,
+            commands=commands,
+            max_runs=max_runs,
+            bytecode_cache=bytecode_cache,
+            timeout=timeout,
+            preamble_cache=preamble_cache,
+            artifact_cache=artifact_cache,
+            fragment_cache=fragment_cache,
+            latex_escape=latex_escape,
+            build_dir=build_dir,
         )
 
-        # Compile with Latex
-        aux_filename = '%s.aux' % language
+        if languages is None:
+            languages = builder.discover_languages()
+        languages = list(languages)
 
-        with project_context.sourcedir_as_cwd():
-            _latest_aux_md5 = None
-            if os.path.exists(aux_filename):
-                _latest_aux_md5 = file_md5(aux_filename)
+        results = schedule(builder, languages, jobs=jobs, force=force)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            if profile:
+                profiler.write_trace(profile)
+            if cprofile:
+                profiler.dump_stats(cprofile)
 
-            for command in commands:
-                if command not in executables:
-                    raise ValueError(
-                        '\'%s\' command is not a valid latex-ji18n executable' %
-                        command)
-                exec_arg = (language_context.localized_tex_filename
-                            if command == 'pdflatex' else language)
-                returncode = executables[command]().run(exec_arg)
-                if returncode != 0:
-                    sys.exit(returncode)
-            if commands[-1] == 'pdflatex':
-                aux_md5 = file_md5(aux_filename)
-                if aux_md5 != _latest_aux_md5:
-                    _latest_aux_md5 = aux_md5
-                    n_runs = 0
-                    for command in reversed(commands):
-                        n_runs += 1
-                        if command != 'pdflatex':
-                            break
-                    for nrun in range(max_runs - n_runs):
-                        returncode = executables['pdflatex']().run(
-                            language_context.localized_tex_filename)
-                        if returncode != 0:
-                            sys.exit(returncode)
-                        aux_md5 = file_md5(aux_filename)
-                        if _latest_aux_md5 == aux_md5:
-                            break
-                        else:
-                            _latest_aux_md5 = aux_md5
-
-        expected_filename = "%s%s" % (language,
-                                      executables[commands[-1]].output_extension)
-        expected_filepath = os.path.join(
-            project_context.source_dirpath, expected_filename
-        )
-        if not os.path.exists(expected_filepath):
-            break
-
-        dist_filepath = os.path.join(project_context.dist_dirpath, expected_filename)
-        os.rename(expected_filepath, dist_filepath)
+    if notify is not None:
+        notify(results)
+    for language in languages:
+        if results[language].returncode != 0:
+            return results[language].returncode
+    return 0
+
+
+def expand_project_paths(paths):
+    """Expand the paths of many projects, returning their absolute paths.
+    Each path can be the directory of a project, a glob pattern matching
+    the directories of many projects or a file listing them, one path or
+    glob pattern per line relative to the file. Empty lines and lines
+    starting with ``#`` are ignored in these files.
+    """
+    project_paths = []
+
+    def _expand(path, dirpath=None):
+        path = os.path.expanduser(path)
+        if dirpath is not None:
+            path = os.path.join(dirpath, path)
+        if glob.has_magic(path):
+            for match in sorted(glob.glob(path, recursive=True)):
+                if os.path.isdir(match):
+                    project_paths.append(os.path.abspath(match))
+        elif os.path.isdir(path):
+            project_paths.append(os.path.abspath(path))
+        elif os.path.isfile(path) and dirpath is None:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        _expand(line, os.path.dirname(os.path.abspath(path)))
+        else:
+            raise ValueError("The project '%s' doesn't exist" % path)
+
+    for path in paths:
+        _expand(path)
+    return list(dict.fromkeys(project_paths))
+
+
+def run_projects(
+    project_paths,
+    environment=LatexJinja2Environment,
+    filters=DEFAULT_FILTERS,
+    commands=["pdflatex"],
+    max_runs=4,
+    jobs=1,
+    force=False,
+    bytecode_cache=None,
+    timeout=None,
+    preamble_cache=False,
+    notify=None,
+    profile=None,
+    cprofile=None,
+    artifact_cache=None,
+    fragment_cache=None,
+    latex_escape=False,
+    build_dir=None,
+):
+    """Build the languages of many projects in a single pool of ``jobs``
+    processes, like :py:func:`run`. The data files and the compiled
+    templates are shared between the projects built by each process.
+
+    Returns a dictionary by project path with the :py:class:`BuildResult`
+    of each language by language or, if the project can't be built, the
+    exception raised, so a project which fails doesn't stop the others. If
+    ``notify`` is defined, is called with the results and the path of each
+    project.
+    """
+    profiler = None
+    if profile or cprofile:
+        profiler = profiling.Profiler(cprofile=bool(cprofile))
+        profiler.enable()
+    try:
+        results, projects, renderers = {}, [], {}
+        for project_path in project_paths:
+            try:
+                builder = create_builder(
+                    renderers,
+                    project_path=project_path,
+                    environment=environment,
+                    filters=filters,
+                    commands=commands,
+                    max_runs=max_runs,
+                    bytecode_cache=bytecode_cache,
+                    timeout=timeout,
+                    max_processes=1,
+                    preamble_cache=preamble_cache,
+                    artifact_cache=artifact_cache,
+                    fragment_cache=fragment_cache,
+                    latex_escape=latex_escape,
+                    build_dir=build_dir,
+                )
+                projects.append((builder, builder.discover_languages()))
+            except Exception as exc:
+                results[project_path] = exc
+        results.update(schedule_many(projects, jobs=jobs, force=force))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            if profile:
+                profiler.write_trace(profile)
+            if cprofile:
+                profiler.dump_stats(cprofile)
+
+    results = {project_path: results[project_path] for project_path in project_paths}
+    if notify is not None:
+        for project_path, project_results in results.items():
+            notify(project_results, project_path)
+    return results
@@ -0,0 +1,261 @@
+"""Build many variants of a language of a project from a stream of records,
+like in a mail merge. Each record is an object of a JSON lines file or a
+row of a CSV file, whose variables override the variables of the language
+context. The variants are rendered and compiled by a pool of processes and
+their documents are written to the distribution directory, named by a
+pattern formatted with the variables of their records, their number
+(``index``, starting at 1) and the ``language``.
+
+Records are read while the variants are built, keeping a limited number of
+variants pending, so the memory used doesn't depend on the number of
+records. Variants are not stored in the build manifest. A variant which
+fails, including those whose filename is already used by a previous
+variant, doesn't stop the others.
+"""
+
+import asyncio
+import concurrent.futures
+import csv
+import glob
+import json
+import os
+import sys
+
+from latex_ji18n.commands.build import ProjectBuilder, project_builder
+from latex_ji18n.environment import LatexJinja2Environment
+from latex_ji18n.executable import executables
+from latex_ji18n.filters import DEFAULT_FILTERS
+from latex_ji18n.io import move_file
+
+
+class VariantResult:
+    """Result of building a variant."""
+
+    def __init__(self, index, returncode=0, filepath=None, log_filepath=None,
+                 error=None):
+        self.index = index
+        self.returncode = returncode
+
+        # document written to the distribution directory
+        self.filepath = filepath
+        self.log_filepath = log_filepath
+
+        # exception raised naming or building the variant
+        self.error = error
+
+
+def read_records(filepath, format=None):
+    """Read the records of a JSON lines or CSV file (``-`` for the standard
+    input) one by one. If ``format`` is not defined, it is guessed from the
+    extension of the file."""
+    if format is None:
+        format = "csv" if filepath.lower().endswith(".csv") else "jsonl"
+    if filepath == "-":
+        f = sys.stdin
+    else:
+        f = open(filepath, encoding="utf-8", newline="")
+    try:
+        if format == "csv":
+            yield from csv.DictReader(f)
+            return
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise ValueError("Invalid record in line %d: %s" % (n, exc))
+            if not isinstance(record, dict):
+                raise ValueError("The record in line %d is not an object" % n)
+            yield record
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def variant_filename(filename_pattern, index, language, record, extension):
+    """Name of the document of a variant in the distribution directory."""
+    try:
+        filename = filename_pattern.format(**dict(
+            record, index=index, language=language
+        ))
+    except (KeyError, IndexError) as exc:
+        raise ValueError("The record doesn't define %s" % exc)
+    if not filename or filename in (".", "..") or (
+        os.path.basename(filename) != filename
+    ):
+        raise ValueError("Invalid filename '%s'" % filename)
+    return filename + extension
+
+
+def build_variant(builder, language, index, record, filename, jobname):
+    """Render and compile a variant of a language overriding its context
+    with a record, moving the output to the distribution directory as
+    ``filename``. The files generated building it are removed, except the
+    log file if it fails."""
+    language_context = builder.language_context_to_build(language, force=True)
+    language_context.load()
+    language_context._push_layer(language_context._escape_latex(record))
+    builder.expose_bibdb()
+
+    build_dirpath = builder.build_dirpath(language)
+    log_filepath = builder.log_filepath(jobname)
+    try:
+        try:
+            builder.renderer.stream(
+                builder.project_context.template_filepath,
+                os.path.join(build_dirpath, "%s.tex" % jobname),
+                context=language_context,
+            )
+        except Exception as exc:
+            return VariantResult(index, returncode=1, error=exc)
+
+        returncode = asyncio.run(
+            builder.compile_language(language_context, jobname=jobname)
+        )
+        output_filepath = os.path.join(
+            build_dirpath,
+            jobname + executables[builder.commands[-1]].output_extension,
+        )
+        if returncode == 0 and not os.path.exists(output_filepath):
+            returncode = 1
+        if returncode != 0:
+            return VariantResult(
+                index, returncode=returncode, log_filepath=log_filepath
+            )
+
+        filepath = os.path.join(builder.project_context.dist_dirpath, filename)
+        move_file(output_filepath, filepath)
+        os.remove(log_filepath)
+        return VariantResult(index, filepath=filepath)
+    finally:
+        for generated_filepath in glob.glob(
+            os.path.join(build_dirpath, glob.escape(jobname) + ".*")
+        ):
+            os.remove(generated_filepath)
+
+
+def _build_variant_job(builder_kwargs, *args):
+    return build_variant(project_builder(**builder_kwargs), *args)
+
+
+def run(
+    records,
+    language=None,
+    project_path=None,
+    filename_pattern="{language}-{index}",
+    environment=LatexJinja2Environment,
+    filters=DEFAULT_FILTERS,
+    commands=["pdflatex"],
+    max_runs=4,
+    jobs=1,
+    bytecode_cache=None,
+    timeout=None,
+    preamble_cache=False,
+    latex_escape=False,
+    build_dir=None,
+    max_pending=None,
+    notify=None,
+):
+    """Build a variant of a language of a project for each record of an
+    iterable, returning the number of variants that failed. The language
+    can be omitted if the project only has one.
+
+    Variants are built by ``jobs`` processes, reading new records only when
+    less than ``max_pending`` variants (by default, two per process) are
+    pending. If ``notify`` is defined, is called with the
+    :py:class:`VariantResult` of each variant, the number of variants built
+    and the number of variants failed as they finish.
+
+    If ``latex_escape`` is ``True``, the LaTeX special characters of the
+    strings of the records are escaped, like those of the data files.
+    """
+    builder = ProjectBuilder(
+        project_path=project_path,
+        environment=environment,
+        filters=filters,
+        commands=commands,
+        max_runs=max_runs,
+        bytecode_cache=bytecode_cache,
+        timeout=timeout,
+        preamble_cache=preamble_cache,
+        latex_escape=latex_escape,
+        build_dir=build_dir,
+    )
+    languages = builder.discover_languages()
+    if language is None:
+        if len(languages) != 1:
+            raise ValueError("The language must be defined")
+        language = languages[0]
+    elif language not in languages:
+        raise ValueError("Unknown language '%s'" % language)
+
+    extension = executables[commands[-1]].output_extension
+    built, failed = 0, 0
+
+    # filenames of the variants, by the index of the first record using them
+    filenames = {}
+
+    def _finished(result):
+        nonlocal built, failed
+        if result.returncode == 0:
+            built += 1
+        else:
+            failed += 1
+        if notify is not None:
+            notify(result, built, failed)
+
+    def _variants():
+        for index, record in enumerate(records, 1):
+            try:
+                filename = variant_filename(
+                    filename_pattern, index, language, record, extension
+                )
+                if filename in filenames:
+                    raise ValueError(
+                        "The filename '%s' is already used by the record %d" % (
+                            filename, filenames[filename])
+                    )
+            except ValueError as exc:
+                _finished(VariantResult(index, returncode=1, error=exc))
+                continue
+            filenames[filename] = index
+            # unique between concurrent merges of the same project
+            jobname = "%s.merge-%d-%d" % (language, os.getpid(), index)
+            yield language, index, record, filename, jobname
+
+    if jobs <= 1:
+        for args in _variants():
+            try:
+                result = build_variant(builder, *args)
+            except Exception as exc:
+                result = VariantResult(args[1], returncode=1, error=exc)
+            _finished(result)
+        return failed
+
+    def _future_finished(future):
+        try:
+            result = future.result()
+        except Exception as exc:
+            # the variant fails, the rest of variants are still built
+            result = VariantResult(pending[future], returncode=1, error=exc)
+        _finished(result)
+
+    if max_pending is None:
+        max_pending = jobs * 2
+    # indexes of the variants pending, by future
+    pending = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        for args in _variants():
+            if len(pending) >= max_pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    _future_finished(future)
+                    del pending[future]
+            future = executor.submit(_build_variant_job, builder.kwargs, *args)
+            pending[future] = args[1]
+        for future in concurrent.futures.as_completed(pending):
+            _future_finished(future)
+    return failed
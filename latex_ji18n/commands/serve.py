@@ -0,0 +1,395 @@
+"""Serve the build of projects through an HTTP API, keeping the project
+contexts, the parsed data files and the compiled templates in memory
+between builds.
+
+- ``GET /health`` responds with the status of the server.
+- ``POST /build`` builds a language of a project, responding with the
+  compiled document. The body of the request is a JSON object with the
+  name of the ``project`` (the name of its directory, optional if only
+  one project is served), the ``language`` and, optionally, a ``context``
+  object whose variables override the variables of the language context,
+  except the layout, the style and the bib database.
+
+Builds are executed by a pool of threads and are rejected when there are
+too many builds waiting for a thread. Requests waiting for a build more
+than a timeout are responded with an error and their build is cancelled.
+Each build is compiled with its own job name in the build directory of the
+language, like the variants of the merge command, so it doesn't modify
+the files of the builds of the project, which are not published in its
+distribution directory.
+"""
+
+import asyncio
+import concurrent.futures
+import glob
+import http.server
+import itertools
+import json
+import os
+import threading
+import time
+
+from latex_ji18n.biber import get_bib_files_from_directory
+from latex_ji18n.commands.build import ProjectBuilder
+from latex_ji18n.environment import LatexJinja2Environment
+from latex_ji18n.executable import ExecutionEngine, executables
+from latex_ji18n.filters import DEFAULT_FILTERS
+
+
+# maximum size of the body of the requests
+MAX_REQUEST_SIZE = 1024 * 1024
+
+# lines of the log of a failed build included in the response
+LOG_TAIL_LINES = 40
+
+
+class BuildError(Exception):
+    """Error building a language, with the HTTP status of the response."""
+
+    def __init__(self, status, message, log=None):
+        super().__init__(message)
+        self.status = status
+        self.log = log
+
+
+class BuildServer:
+    """Builds the languages of some projects on demand, using ``workers``
+    threads and queueing up to ``max_queue`` builds. Waiting for a build,
+    including the time queued, fails after ``request_timeout`` seconds,
+    while each command is killed after ``timeout`` seconds. No more than
+    ``max_processes`` commands (by default, one per worker) are executed
+    at the same time by all the projects."""
+
+    def __init__(
+        self,
+        project_paths,
+        environment=LatexJinja2Environment,
+        filters=DEFAULT_FILTERS,
+        commands=["pdflatex"],
+        max_runs=4,
+        bytecode_cache=None,
+        timeout=None,
+        preamble_cache=False,
+        workers=1,
+        max_queue=8,
+        request_timeout=None,
+        latex_escape=False,
+        build_dir=None,
+        max_processes=None,
+    ):
+        self.engine = ExecutionEngine(
+            max_processes=max_processes or workers, timeout=timeout
+        )
+        self.builders = {}
+        for project_path in project_paths:
+            name = os.path.basename(os.path.normpath(project_path))
+            if name in self.builders:
+                raise ValueError("There are multiple projects named '%s'" % name)
+            self.builders[name] = ProjectBuilder(
+                project_path=project_path,
+                environment=environment,
+                filters=filters,
+                commands=commands,
+                max_runs=max_runs,
+                bytecode_cache=bytecode_cache,
+                timeout=timeout,
+                preamble_cache=preamble_cache,
+                latex_escape=latex_escape,
+                build_dir=build_dir,
+                engine=self.engine,
+            )
+        self.request_timeout = request_timeout
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        # a language can't be built by multiple threads at the same time,
+        # nor while the context of its project is reset
+        self._language_locks = {}
+
+        # number of the builds, which name their files
+        self._counter = itertools.count(1)
+
+        # modification times of the data and .bib files of each project when
+        # its context was loaded
+        self._snapshots = {
+            name: self._snapshot(builder) for name, builder in self.builders.items()
+        }
+
+    def _snapshot(self, builder):
+        project_context = builder.project_context
+        filepaths = [
+            project_context._get_meta(meta_prop) for meta_prop in (
+                "data_filepath",
+                "layout_filepath",
+                "style_filepath",
+                "data_private_filepath",
+                "layout_private_filepath",
+                "style_private_filepath",
+            )
+        ]
+        source_dirpath = project_context.source_dirpath
+        filepaths.extend(
+            os.path.join(source_dirpath, fn)
+            for fn in get_bib_files_from_directory(source_dirpath)
+        )
+        return {
+            filepath: os.path.getmtime(filepath)
+            for filepath in filepaths if filepath and os.path.exists(filepath)
+        }
+
+    def _language_lock(self, project, language):
+        with self._lock:
+            return self._language_locks.setdefault(
+                (project, language), threading.Lock()
+            )
+
+    def status(self):
+        with self._lock:
+            pending = self._pending
+        return {
+            "status": "ok",
+            "projects": sorted(self.builders),
+            "workers": self.workers,
+            "pending": pending,
+            "max_queue": self.max_queue,
+        }
+
+    def builder(self, project):
+        if project is None and len(self.builders) == 1:
+            project = next(iter(self.builders))
+        if project is None:
+            raise BuildError(400, "The project must be defined")
+        if project not in self.builders:
+            raise BuildError(404, "Unknown project '%s'" % project)
+
+        builder = self.builders[project]
+        with self._lock:
+            changed = self._snapshot(builder) != self._snapshots[project]
+        if changed:
+            # data files changed, load them again when no language of the
+            # project is being built, taking the locks always in the same order
+            locks = [
+                self._language_lock(project, language)
+                for language in sorted(builder.discover_languages())
+            ]
+            for lock in locks:
+                lock.acquire()
+            try:
+                with self._lock:
+                    snapshot = self._snapshot(builder)
+                    if snapshot != self._snapshots[project]:
+                        builder.reset_project_context()
+                        self._snapshots[project] = self._snapshot(builder)
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+        return project, builder
+
+    def build(self, project, language, context=None):
+        """Build a language of a project, overriding the variables of its
+        context with the variables of ``context``. Returns the content of
+        the compiled document."""
+        project, builder = self.builder(project)
+        if language not in builder.discover_languages():
+            raise BuildError(
+                404, "Unknown language '%s' of project '%s'" % (language, project)
+            )
+        # like in the i18n files, the layout, the style and the bib database
+        # can't be overridden
+        for forbidden_attr in builder.project_context._config.get_forbidden_attrs():
+            if forbidden_attr in (context or {}):
+                raise BuildError(
+                    400, "The context can not contain a variable '%s'" % forbidden_attr
+                )
+
+        if not self._slots.acquire(blocking=False):
+            raise BuildError(503, "Too many builds pending")
+        with self._lock:
+            self._pending += 1
+
+        def _done(future):
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+        deadline = None
+        if self.request_timeout is not None:
+            deadline = time.monotonic() + self.request_timeout
+        future = self._executor.submit(
+            self._build, project, builder, language, context or {}, deadline
+        )
+        future.add_done_callback(_done)
+        try:
+            return future.result(timeout=self.request_timeout)
+        except concurrent.futures.TimeoutError:
+            # not started yet, otherwise it is cancelled by its deadline
+            future.cancel()
+            raise BuildError(
+                504, "Build timed out after %s seconds" % self.request_timeout
+            )
+
+    def _build(self, project, builder, language, context, deadline=None):
+        """Build a language overriding its context, compiling it with its
+        own job name. The build is cancelled, killing its commands, when
+        ``deadline`` is reached."""
+
+        def _remaining():
+            if deadline is None:
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise BuildError(504, "Build timed out")
+            return remaining
+
+        jobname = "%s.serve-%d-%d" % (language, os.getpid(), next(self._counter))
+        with self._language_lock(project, language):
+            _remaining()
+            language_context = builder.language_context_to_build(language, force=True)
+            language_context.load()
+            language_context._push_layer(language_context._escape_latex(context))
+            builder.expose_bibdb()
+
+            build_dirpath = builder.build_dirpath(language)
+            if not os.path.exists(build_dirpath):
+                os.makedirs(build_dirpath, exist_ok=True)
+            log_filepath = builder.log_filepath(jobname)
+            try:
+                try:
+                    builder.renderer.stream(
+                        builder.project_context.template_filepath,
+                        os.path.join(build_dirpath, "%s.tex" % jobname),
+                        context=language_context,
+                    )
+                except Exception as exc:
+                    raise BuildError(500, "Failed rendering the template: %s" % exc)
+
+                try:
+                    returncode = asyncio.run(asyncio.wait_for(
+                        builder.compile_language(language_context, jobname=jobname),
+                        _remaining(),
+                    ))
+                except asyncio.TimeoutError:
+                    raise BuildError(504, "Build timed out")
+                output_filepath = os.path.join(
+                    build_dirpath,
+                    jobname + executables[builder.commands[-1]].output_extension,
+                )
+                if returncode != 0 or not os.path.exists(output_filepath):
+                    with open(log_filepath, encoding="utf-8", errors="replace") as f:
+                        log = f.read().splitlines()[-LOG_TAIL_LINES:]
+                    raise BuildError(
+                        500,
+                        "Failed with exit status %d" % (returncode or 1),
+                        log="\n".join(log),
+                    )
+                with open(output_filepath, "rb") as f:
+                    return f.read()
+            finally:
+                for generated_filepath in glob.glob(
+                    os.path.join(build_dirpath, glob.escape(jobname) + ".*")
+                ) + [log_filepath]:
+                    if os.path.exists(generated_filepath):
+                        os.remove(generated_filepath)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class BuildRequestHandler(http.server.BaseHTTPRequestHandler):
+    def _respond(self, status, body, content_type="application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._respond(404, {"error": "Not found"})
+        self._respond(200, self.server.build_server.status())
+
+    def do_POST(self):
+        if self.path != "/build":
+            return self._respond(404, {"error": "Not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            return self._respond(400, {"error": "Invalid Content-Length"})
+        if length > MAX_REQUEST_SIZE:
+            return self._respond(413, {"error": "Request too large"})
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            project = request.get("project")
+            language = request["language"]
+            context = request.get("context") or {}
+            if not isinstance(context, dict):
+                raise ValueError("'context' must be an object")
+        except (ValueError, KeyError, AttributeError) as exc:
+            return self._respond(400, {"error": "Invalid request: %s" % exc})
+
+        try:
+            output = self.server.build_server.build(project, language, context)
+        except BuildError as exc:
+            body = {"error": str(exc)}
+            if exc.log is not None:
+                body["log"] = exc.log
+            return self._respond(exc.status, body)
+        except Exception as exc:
+            self.log_error("Build failed: %s", exc)
+            return self._respond(500, {"error": "Build failed: %s" % exc})
+        self._respond(200, output, content_type="application/pdf")
+
+
+def run(
+    project_paths,
+    host="127.0.0.1",
+    port=8000,
+    environment=LatexJinja2Environment,
+    filters=DEFAULT_FILTERS,
+    commands=["pdflatex"],
+    max_runs=4,
+    bytecode_cache=None,
+    timeout=None,
+    preamble_cache=False,
+    workers=1,
+    max_queue=8,
+    request_timeout=None,
+    latex_escape=False,
+    build_dir=None,
+    max_processes=None,
+):
+    """Serve the build of the projects until the process is interrupted."""
+    build_server = BuildServer(
+        project_paths,
+        environment=environment,
+        filters=filters,
+        commands=commands,
+        max_runs=max_runs,
+        bytecode_cache=bytecode_cache,
+        timeout=timeout,
+        preamble_cache=preamble_cache,
+        workers=workers,
+        max_queue=max_queue,
+        request_timeout=request_timeout,
+        latex_escape=latex_escape,
+        build_dir=build_dir,
+        max_processes=max_processes,
+    )
+    httpd = http.server.ThreadingHTTPServer((host, port), BuildRequestHandler)
+    httpd.daemon_threads = True
+    httpd.build_server = build_server
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+        build_server.close()
@@ -0,0 +1,262 @@
+"""Watch the files of a project and build again the languages affected
+by each change, keeping the project context and the compiled template
+in memory between builds.
+
+Changes in the i18n file of a language only build that language and
+changes in other source files, like images, only build the languages
+which read them compiling. Any other change (the templates, the data
+files or the bibliography) builds all the languages. Files generated by
+the build inside the source directory are ignored.
+
+Uses inotify if the ``inotify_simple`` package is installed, otherwise
+the watched directories are polled.
+"""
+
+import os
+import time
+
+from latex_ji18n.commands.build import ProjectBuilder, schedule
+from latex_ji18n.environment import LatexJinja2Environment
+from latex_ji18n.filters import DEFAULT_FILTERS
+
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+class PollingWatcher:
+    """Detects changes in the files of some directories comparing their
+    modification times and sizes periodically."""
+
+    def __init__(self, dirpaths, interval=0.5):
+        self.dirpaths = dirpaths
+        self.interval = interval
+        self._snapshot = self.snapshot()
+
+    def snapshot(self):
+        response = {}
+        for dirpath in self.dirpaths:
+            for root, _, filenames in os.walk(dirpath):
+                for fn in filenames:
+                    filepath = os.path.join(root, fn)
+                    try:
+                        stat = os.stat(filepath)
+                    except FileNotFoundError:
+                        continue
+                    response[filepath] = (stat.st_mtime_ns, stat.st_size)
+        return response
+
+    def read(self, timeout=None):
+        """Wait until some files change or ``timeout`` seconds elapse,
+        returning the paths of the changed files."""
+        start = time.monotonic()
+        while True:
+            snapshot = self.snapshot()
+            changes = {
+                filepath for filepath in set(snapshot) | set(self._snapshot)
+                if snapshot.get(filepath) != self._snapshot.get(filepath)
+            }
+            self._snapshot = snapshot
+            if changes:
+                return changes
+            if timeout is not None and time.monotonic() - start >= timeout:
+                return changes
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Detects changes in the files of some directories using inotify."""
+
+    def __init__(self, dirpaths):
+        self._inotify = inotify_simple.INotify()
+        self._flags = (
+            inotify_simple.flags.CLOSE_WRITE
+            | inotify_simple.flags.CREATE
+            | inotify_simple.flags.DELETE
+            | inotify_simple.flags.MOVED_FROM
+            | inotify_simple.flags.MOVED_TO
+        )
+        self._dirpaths_by_wd = {}
+        for dirpath in dirpaths:
+            for root, _, _ in os.walk(dirpath):
+                self._add_watch(root)
+
+    def _add_watch(self, dirpath):
+        self._dirpaths_by_wd[self._inotify.add_watch(dirpath, self._flags)] = dirpath
+
+    def read(self, timeout=None):
+        """Wait until some files change or ``timeout`` seconds elapse,
+        returning the paths of the changed files."""
+        changes = set()
+        events = self._inotify.read(
+            timeout=None if timeout is None else int(timeout * 1000)
+        )
+        for event in events:
+            dirpath = self._dirpaths_by_wd.get(event.wd)
+            if dirpath is None or not event.name:
+                continue
+            filepath = os.path.join(dirpath, event.name)
+            if event.mask & inotify_simple.flags.ISDIR:
+                if event.mask & inotify_simple.flags.CREATE:
+                    self._add_watch(filepath)
+                continue
+            changes.add(filepath)
+        return changes
+
+    def close(self):
+        self._inotify.close()
+
+
+def create_watcher(dirpaths, polling=False):
+    if inotify_simple is not None and not polling:
+        return InotifyWatcher(dirpaths)
+    return PollingWatcher(dirpaths)
+
+
+def wait_changes(watcher, debounce=0.3):
+    """Wait for changes, collecting all the changes made until no more
+    changes happen for ``debounce`` seconds."""
+    changes = set()
+    while not changes:
+        changes = watcher.read()
+    while True:
+        new_changes = watcher.read(timeout=debounce)
+        if not new_changes:
+            return changes
+        changes |= new_changes
+
+
+def is_generated_file(builder, filepath, languages):
+    """Checks if a file has been generated building some language, which
+    are the rendered templates and the files of the build directories."""
+    for language in languages:
+        if filepath.startswith(builder.build_dirpath(language) + os.sep):
+            return True
+    if os.path.dirname(filepath) != builder.project_context.source_dirpath:
+        return False
+    filename = os.path.basename(filepath)
+    schema = builder.project_context._config.localized_template_name_schema()
+    return any(filename == schema % language for language in languages)
+
+
+def affected_languages(builder, filepaths, languages):
+    """Returns the languages that must be built again after changes in some
+    files, if the project context must be loaded again and if the
+    bibliography database must be parsed again."""
+    project_context = builder.project_context
+    i18n_dirpaths = [
+        project_context._get_meta("i18n_dirpath"),
+        os.path.join(
+            project_context._get_meta("i18n_dirpath"),
+            project_context._get_meta("private_dirname"),
+        ),
+    ]
+    config_dirpath = os.path.join(
+        project_context.project_path, project_context._get_meta("config_dirname")
+    )
+    template_filepaths = builder.renderer.template_filepaths(
+        project_context.template_filepath
+    )
+
+    response, reload_project, reload_bibdb = set(), False, False
+    for filepath in filepaths:
+        dirpath = os.path.dirname(filepath)
+        if dirpath in i18n_dirpaths:
+            language, ext = os.path.splitext(os.path.basename(filepath))
+            if ext == ".yml" and language in languages:
+                response.add(language)
+            continue
+        if is_generated_file(builder, filepath, languages):
+            continue
+        if filepath.startswith(config_dirpath + os.sep):
+            reload_project = True
+        elif os.path.splitext(filepath)[-1] == ".bib":
+            reload_bibdb = True
+        elif filepath not in template_filepaths:
+            # other source files only affect the languages which read them
+            # compiling or that have not been compiled yet
+            relpath = os.path.relpath(filepath, project_context.project_path)
+            response.update(
+                language for language in languages
+                if language not in builder.manifest.languages
+                or relpath in builder.manifest.dependencies(language)
+            )
+            continue
+        response.update(languages)
+    return response, reload_project, reload_bibdb
+
+
+def run(
+    project_path=None,
+    environment=LatexJinja2Environment,
+    filters=DEFAULT_FILTERS,
+    commands=["pdflatex"],
+    max_runs=4,
+    bytecode_cache=None,
+    timeout=None,
+    preamble_cache=False,
+    debounce=0.3,
+    polling=False,
+    notify=None,
+    latex_escape=False,
+    build_dir=None,
+):
+    """Build the project and build it again after each change until the
+    process is interrupted. After each build, ``notify`` is called, if
+    defined, with the :py:class:`latex_ji18n.commands.build.BuildResult`
+    objects of the built languages or with the exception raised building.
+    """
+    builder = ProjectBuilder(
+        project_path=project_path,
+        environment=environment,
+        filters=filters,
+        commands=commands,
+        max_runs=max_runs,
+        bytecode_cache=bytecode_cache,
+        timeout=timeout,
+        preamble_cache=preamble_cache,
+        latex_escape=latex_escape,
+        build_dir=build_dir,
+    )
+    project_context = builder.project_context
+    dirpaths = [
+        dirpath for dirpath in (
+            os.path.join(
+                project_context.project_path,
+                project_context._get_meta("config_dirname"),
+            ),
+            project_context._get_meta("i18n_dirpath"),
+            project_context.source_dirpath,
+        ) if os.path.isdir(dirpath)
+    ]
+
+    def _build(languages, force=False):
+        try:
+            results = schedule(builder, languages, force=force)
+        except Exception as exc:
+            results = exc
+        if notify is not None:
+            notify(results)
+
+    # watched before the first build, so changes made meanwhile are not lost
+    watcher = create_watcher(dirpaths, polling=polling)
+    try:
+        _build(builder.discover_languages())
+        while True:
+            changes = wait_changes(watcher, debounce=debounce)
+            languages, reload_project, reload_bibdb = affected_languages(
+                builder, changes, builder.discover_languages()
+            )
+            if reload_project:
+                builder.reset_project_context()
+            elif reload_bibdb:
+                builder.project_context.bibdb.reset()
+            if languages:
+                _build(sorted(languages), force=True)
+    finally:
+        watcher.close()
@@ -12,6 +12,16 @@ DEFAULT_SOURCE_DIRNAME = "src"
 DEFAULT_DIST_DIRNAME = "dist"
 DEFAULT_TEMPLATE_FILENAME = "template.tex"
 DEFAULT_BIBDB_VARIABLE_NAME = "_bibdb"
+DEFAULT_CACHE_DIRNAME = ".latex-ji18n"
+
+
+def user_cache_dirpath():
+    """Cache directory of latex-ji18n for the current user, located at
+    ``$XDG_CACHE_HOME`` or ``~/.cache`` if not defined."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "latex-ji18n")
 
 
 class BaseConfig:
@@ -27,6 +37,8 @@ class BaseConfig:
             "style_filename": self.style_filename,
             "template_filename": self.template_filename,
             "bibdb_variable_name": self.bibdb_variable_name,
+            "cache_dirname": self.cache_dirname,
+            "latex_escape": self.latex_escape,
         }
 
     def get_forbidden_attrs(self):
@@ -55,6 +67,8 @@ class Config(BaseConfig):
         style_filename=DEFAULT_STYLE_FILENAME,
         template_filename=DEFAULT_TEMPLATE_FILENAME,
         bibdb_variable_name=DEFAULT_BIBDB_VARIABLE_NAME,
+        cache_dirname=DEFAULT_CACHE_DIRNAME,
+        latex_escape=False,
     ):
         self.config_dirname = config_dirname
         self.i18n_dirname = i18n_dirname
@@ -66,3 +80,7 @@ class Config(BaseConfig):
         self.style_filename = style_filename
         self.template_filename = template_filename
         self.bibdb_variable_name = bibdb_variable_name
+        self.cache_dirname = cache_dirname
+
+        # escape the LaTeX special characters of the data and i18n files
+        self.latex_escape = latex_escape
@@ -1,15 +1,26 @@
+import collections
 import contextlib
 import inspect
 import os
+import threading
+import types
 
-from latex_ji18n.biber import get_db_entries_by_type_from_dir_bib_files
+from latex_ji18n import profiling
+from latex_ji18n.biber import LazyBibDatabase
 from latex_ji18n.config import Config
 from latex_ji18n.io import read_yaml_file
+from latex_ji18n.latex import escape_latex_data
 
 
-class BaseContext(dict):
+class BaseContext(collections.ChainMap):
+    """Context composed by layers of data, which are looked up in order
+    without merging them. The first layer stores the metadata of the
+    context and is the only one that can be modified, the rest are
+    read-only.
+    """
+
     def __init__(self, config=Config, metadata_dict="__config", **kwargs):
-        super().__init__(**kwargs)
+        super().__init__(dict(**kwargs))
 
         self._metadata_dict = metadata_dict
         self[self._metadata_dict] = {}
@@ -24,12 +35,27 @@ class BaseContext(dict):
         self._prepared = False
         self._loaded = False
 
+        # guards the preparation and loading of the layers
+        self._lock = threading.RLock()
+
     def _get_meta(self, key, default=None):
         return self[self._metadata_dict].get(key, default)
 
     def _set_meta(self, key, value):
         self[self._metadata_dict][key] = value
 
+    def _escape_latex(self, data):
+        """Escape the LaTeX special characters of the strings of some data
+        if the context is configured to escape them."""
+        if not self._get_meta("latex_escape"):
+            return data
+        return escape_latex_data(data)
+
+    def _push_layer(self, data):
+        """Add a read-only layer of data which takes precedence over the
+        layers previously added."""
+        self.maps.insert(1, types.MappingProxyType(data))
+
     def _prepare_file(
         self,
         filepath,
@@ -45,18 +71,6 @@ class BaseContext(dict):
         if os.path.exists(filepath):
             self._set_meta(target_meta_prop_name, filepath)
 
-    def update(self, newdict, *args, **kwargs):
-        if hasattr(newdict, "_metadata_dict"):
-            # Preserve metadata merging contexts
-            self[self._metadata_dict].update(newdict[newdict._metadata_dict])
-
-            newdict_meta = newdict[newdict._metadata_dict]
-            del newdict[newdict._metadata_dict]
-            super().update(newdict, *args, **kwargs)
-            newdict[newdict._metadata_dict] = newdict_meta
-        else:
-            super().update(newdict, *args, **kwargs)
-
 
 class ProjectContext(BaseContext):
     """Common context shared by all language contexts of the project."""
@@ -79,6 +93,14 @@ class ProjectContext(BaseContext):
     def dist_dirpath(self):
         return os.path.join(self.project_path, self._get_meta("dist_dirname"))
 
+    @property
+    def cache_dirpath(self):
+        return os.path.join(self.project_path, self._get_meta("cache_dirname"))
+
+    @property
+    def yaml_cache_dirpath(self):
+        return os.path.join(self.cache_dirpath, "yaml")
+
     @property
     def template_filepath(self):
         _tfp = self._get_meta("template_filepath")
@@ -89,6 +111,15 @@ class ProjectContext(BaseContext):
 
     def _prepare(self):
         """Prepare the context."""
+        with self._lock:
+            if self._prepared:
+                return
+            with profiling.span(
+                "ProjectContext._prepare", "context", project_path=self.project_path
+            ):
+                self._prepare_locked()
+
+    def _prepare_locked(self):
         if self._prepared:
             return
 
@@ -182,37 +213,59 @@ class ProjectContext(BaseContext):
         )
         self._prepare_file(i18n_private_dirpath, "i18n_private_dirpath")
 
-        # Load bib databases
-        self.update({self._get_meta("bibdb_variable_name"):
-                     get_db_entries_by_type_from_dir_bib_files(source_dirpath)})
+        # Bib databases, parsed when accessed
+        self.bibdb = LazyBibDatabase(
+            source_dirpath,
+            cache_dirpath=os.path.join(self.cache_dirpath, "bibtex"),
+        )
+        self[self._get_meta("bibdb_variable_name")] = self.bibdb
 
         self._prepared = True
 
     def load(self):
-        if self._loaded:
-            return
-
-        data_file_meta_props = [
-            "data_filepath",
-            "layout_filepath",
-            "style_filepath",
-            "data_private_filepath",
-            "layout_private_filepath",
-            "style_private_filepath",
-        ]
-
-        for data_file_meta_prop in data_file_meta_props:
-            # print(data_file_meta_prop, self[self._metadata_dict])
-            if data_file_meta_prop in self[self._metadata_dict]:
-                partial_context = read_yaml_file(self._get_meta(data_file_meta_prop))
-                if data_file_meta_prop.startswith(("layout", "style")):
-                    vars_group = data_file_meta_prop.split("_")[0]
-                    if vars_group not in self:
-                        self[vars_group] = {}
-                    self[vars_group].update(partial_context)
-                else:
-                    self.update(partial_context)
-        self._loaded = True
+        """Load the data files adding a layer for each one. Data files are
+        added as layers in the root of the context, layout and style files
+        are added as layers of the ``layout`` and ``style`` variables.
+        """
+        with self._lock:
+            if self._loaded:
+                return
+
+            data_file_meta_props = [
+                "data_filepath",
+                "layout_filepath",
+                "style_filepath",
+                "data_private_filepath",
+                "layout_private_filepath",
+                "style_private_filepath",
+            ]
+
+            vars_groups = {}
+            for data_file_meta_prop in data_file_meta_props:
+                if data_file_meta_prop in self[self._metadata_dict]:
+                    # layout and style files configure LaTeX, so they are
+                    # not escaped
+                    is_data_file = data_file_meta_prop.startswith("data")
+                    partial_context = read_yaml_file(
+                        self._get_meta(data_file_meta_prop),
+                        cache_dirpath=self.yaml_cache_dirpath,
+                        latex_escape=is_data_file and bool(
+                            self._get_meta("latex_escape")
+                        ),
+                    )
+                    if not is_data_file:
+                        vars_group = data_file_meta_prop.split("_")[0]
+                        vars_groups.setdefault(vars_group, []).insert(
+                            0, types.MappingProxyType(partial_context)
+                        )
+                    else:
+                        self._push_layer(partial_context)
+
+            self._push_layer({
+                vars_group: collections.ChainMap(*layers)
+                for vars_group, layers in vars_groups.items()
+            })
+            self._loaded = True
 
     def discover_languages(self):
         self._prepare()
@@ -265,6 +318,10 @@ class LanguageContext(BaseContext):
 
     def _prepare(self):
         self.project_context._prepare()
+        with self._lock:
+            self._prepare_locked()
+
+    def _prepare_locked(self):
         if self._prepared:
             return
 
@@ -300,37 +357,55 @@ class LanguageContext(BaseContext):
                 raise ValueError(msg)
 
     def load(self):
-        """Load the data files to populate the context. The order of
-        updating is the next.
+        """Load the data files to populate the context. Each file is a
+        layer of the context and they are looked up in the next order, so
+        the first files override the values of the latest ones.
 
-        - config/data.yml
-        - config/layout.yml
-        - config/style.yml
-        - config/_private/data.yml
-        - config/_private/layout.yml
-        - config/_private/style.yml
-        - _i18n/{language}.yml
         - _i18n/_private/{language}.yml
+        - _i18n/{language}.yml
+        - config/_private/style.yml
+        - config/_private/layout.yml
+        - config/_private/data.yml
+        - config/style.yml
+        - config/layout.yml
+        - config/data.yml
+
+        The layers of the project context are shared by all the language
+        contexts, so they are not copied.
         """
         self._prepare()
 
         self.project_context.load()
-        if self._loaded:
-            return
-
-        data = read_yaml_file(self._get_meta("i18n_filepath"))
-        self._check_forbidden_attrs(data)
-        self.update(data)
-
-        i18n_private_dirpath = self._get_meta("i18n_private_dirpath")
-        if i18n_private_dirpath:
-            i18n_private_filepath = os.path.join(
-                i18n_private_dirpath, "%s.yml" % self._get_meta("language")
+        with self._lock:
+            if self._loaded:
+                return
+
+            # project layers, the first one also stores the project metadata
+            self.maps.append(types.MappingProxyType(self.project_context.maps[0]))
+            self.maps.extend(self.project_context.maps[1:])
+
+            yaml_cache_dirpath = self.project_context.yaml_cache_dirpath
+            latex_escape = bool(self._get_meta("latex_escape"))
+            data = read_yaml_file(
+                self._get_meta("i18n_filepath"),
+                cache_dirpath=yaml_cache_dirpath,
+                latex_escape=latex_escape,
             )
-            data = read_yaml_file(i18n_private_filepath)
             self._check_forbidden_attrs(data)
-            self.update(data)
+            self._push_layer(data)
 
-        self.update(self.project_context)
-
-        self._loaded = True
+            i18n_private_dirpath = self._get_meta("i18n_private_dirpath")
+            if i18n_private_dirpath:
+                i18n_private_filepath = os.path.join(
+                    i18n_private_dirpath, "%s.yml" % self._get_meta("language")
+                )
+                if os.path.exists(i18n_private_filepath):
+                    data = read_yaml_file(
+                        i18n_private_filepath,
+                        cache_dirpath=yaml_cache_dirpath,
+                        latex_escape=latex_escape,
+                    )
+                    self._check_forbidden_attrs(data)
+                    self._push_layer(data)
+
+            self._loaded = True
@@ -1,4 +1,8 @@
-from jinja2 import Environment
+import os
+
+from jinja2 import Environment, FileSystemBytecodeCache
+
+from latex_ji18n.fragments import FragmentCache, FragmentCacheExtension
 
 
 class LatexJinja2Environment(Environment):
@@ -15,8 +19,21 @@ class LatexJinja2Environment(Environment):
         trim_blocks=True,
         lstrip_blocks=True,
         autoescape=False,
+        bytecode_cache_dirpath=None,
+        fragment_cache_dirpath=None,
+        fragment_cache_max_size=64 * 1024 * 1024,
         **kwargs
     ):
+        if bytecode_cache_dirpath:
+            # compiled templates stored on disk, shared between builds
+            if not os.path.exists(bytecode_cache_dirpath):
+                os.makedirs(bytecode_cache_dirpath, exist_ok=True)
+            kwargs["bytecode_cache"] = FileSystemBytecodeCache(
+                directory=bytecode_cache_dirpath
+            )
+        kwargs["extensions"] = list(kwargs.get("extensions", [])) + [
+            FragmentCacheExtension
+        ]
         super().__init__(
             block_start_string=block_start_string,
             block_end_string=block_end_string,
@@ -31,3 +48,8 @@ class LatexJinja2Environment(Environment):
             autoescape=autoescape,
             **kwargs
         )
+        if fragment_cache_dirpath:
+            # fragments stored on disk, shared between builds
+            self.fragment_cache = FragmentCache(
+                dirpath=fragment_cache_dirpath, max_size=fragment_cache_max_size
+            )
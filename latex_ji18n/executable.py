@@ -1,17 +1,107 @@
 import abc
+import asyncio
 import inspect
 import os
 import shutil
+import signal
 import subprocess
-import sys
-import time
+import threading
+
+from latex_ji18n import profiling
+
+
+# exit status of commands killed because they exceeded their timeout,
+# the same used by the GNU ``timeout`` utility
+TIMEOUT_RETURNCODE = 124
+
+
+def _kill(proc):
+    """Kill a process and the processes started by it, like biber started
+    by a wrapper script, which are in the process group of the process."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except AttributeError:
+        # no process groups, like in Windows
+        proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+class ExecutionEngine:
+    """Runs commands as asyncio subprocesses, limiting the number of
+    processes running at the same time and killing the processes which
+    exceed their timeout, with the processes started by them.
+
+    Each build runs its own event loop, so the number of processes is
+    limited by a semaphore shared by all the threads of the process.
+    """
+
+    def __init__(self, max_processes=1, timeout=None):
+        self.max_processes = max_processes
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(max_processes)
+
+    async def _acquire(self):
+        # the semaphore is waited for by other thread to not block the loop
+        acquire = asyncio.get_running_loop().run_in_executor(
+            None, self._semaphore.acquire
+        )
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            acquire.add_done_callback(lambda _: self._semaphore.release())
+            raise
+
+    async def call(self, cmd, cwd=None, log_filepath=None, timeout=None, env=None):
+        """Execute a command, returning its exit status. If ``log_filepath``
+        is defined, the output of the command is appended to that file,
+        otherwise is written to the output of the current process.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        await self._acquire()
+        try:
+            log_file = open(log_filepath, "ab") if log_filepath else None
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    cwd=cwd,
+                    env=env,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT if log_file else None,
+                    start_new_session=True,
+                )
+                try:
+                    return await asyncio.wait_for(proc.wait(), timeout)
+                except asyncio.TimeoutError:
+                    _kill(proc)
+                    await proc.wait()
+                    if log_file:
+                        log_file.write((
+                            "\nlatex-ji18n: '%s' killed after %s seconds\n"
+                            % (" ".join(cmd), timeout)
+                        ).encode("utf-8"))
+                    return TIMEOUT_RETURNCODE
+                except asyncio.CancelledError:
+                    # the build has been cancelled, don't leave it running
+                    _kill(proc)
+                    await proc.wait()
+                    raise
+            finally:
+                if log_file:
+                    log_file.close()
+        finally:
+            self._semaphore.release()
 
 
 class LatexExecutable(object):
     """Base class for Latex executables."""
 
-    def __init__(self):
+    def __init__(self, engine=None):
         self.binary = shutil.which(self.name)
+        self.engine = engine or ExecutionEngine()
 
     @property
     @abc.abstractmethod
@@ -19,10 +109,8 @@ class LatexExecutable(object):
         pass
 
     @abc.abstractmethod
-    def run(self):
-        """Generates a PDF from LaTeX a source. If there are errors generating
-        a :py:class:`latex_ji18n.exceptions.LatexError`` is raised.
-        """
+    def command(self, filepath):
+        """Returns the command that processes a file."""
         pass
 
     def is_available(self):
@@ -36,27 +124,87 @@ class LatexExecutable(object):
         """
         return bool(self.binary)
 
-    def blocking_call(self, cmd):
-        proc = subprocess.Popen(
-            cmd, stderr=sys.stderr, stdout=sys.stdout, stdin=open(os.devnull))
-        while proc.poll() is None:
-            time.sleep(.001)
-        return proc.returncode
+    async def arun(self, filepath, cwd=None, log_filepath=None, timeout=None,
+                   env=None, **kwargs):
+        """Process a file with the executable using its execution engine,
+        returning the exit status. Additional keyword arguments are passed
+        to :py:meth:`command`."""
+        cmd = self.command(filepath, **kwargs)
+        with profiling.span(self.name, "executable", cmd=cmd, cwd=cwd) as args:
+            args["returncode"] = await self.engine.call(
+                cmd,
+                cwd=cwd,
+                log_filepath=log_filepath,
+                timeout=timeout,
+                env=env,
+            )
+        return args["returncode"]
+
+    def run(self, filepath, cwd=None, log_filepath=None, timeout=None,
+            env=None, **kwargs):
+        return asyncio.run(self.arun(
+            filepath,
+            cwd=cwd,
+            log_filepath=log_filepath,
+            timeout=timeout,
+            env=env,
+            **kwargs
+        ))
+
+    def blocking_call(self, cmd, cwd=None):
+        return asyncio.run(self.engine.call(cmd, cwd=cwd))
 
 
 class PdfLatexExecutable(LatexExecutable):
     name = "pdflatex"
     output_extension = ".pdf"
 
-    def run(self, filepath):
-        return self.blocking_call([self.binary, filepath])
+    def command(self, filepath, fmt=None, jobname=None, output_dirpath=None):
+        # '-recorder' writes the files read and written in a '.fls' file
+        cmd = [self.binary, "-recorder"]
+        if fmt:
+            cmd.append("-fmt=%s" % fmt)
+        if jobname:
+            cmd.append("-jobname=%s" % jobname)
+        if output_dirpath:
+            cmd.append("-output-directory=%s" % output_dirpath)
+        cmd.append(filepath)
+        return cmd
+
+    async def adump_format(self, filepath, jobname, output_dirpath, cwd=None,
+                           log_filepath=None, timeout=None):
+        """Dump a format file processing a file, which must end with
+        ``\\dump``, in initialization mode."""
+        # '-recorder' writes the files read dumping it, like local packages
+        cmd = [
+            self.binary,
+            "-ini",
+            "-recorder",
+            "-jobname=%s" % jobname,
+            "-output-directory=%s" % output_dirpath,
+            "&%s" % self.name,
+            filepath,
+        ]
+        with profiling.span(self.name, "executable", cmd=cmd, cwd=cwd) as args:
+            args["returncode"] = await self.engine.call(
+                cmd,
+                cwd=cwd,
+                log_filepath=log_filepath,
+                timeout=timeout,
+            )
+        return args["returncode"]
 
 
 class BiberExecutable(LatexExecutable):
     name = "biber"
 
-    def run(self, filepath):
-        return self.blocking_call([self.binary, filepath])
+    def command(self, filepath, output_dirpath=None):
+        # the '.bcf' file is also read from the output directory
+        cmd = [self.binary]
+        if output_dirpath:
+            cmd.append("--output-directory=%s" % output_dirpath)
+        cmd.append(filepath)
+        return cmd
 
 
 executables = {
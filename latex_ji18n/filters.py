@@ -1,6 +1,78 @@
-from inflection import camelize
+from latex_ji18n.latex import escape_latex
+
+
+def camelize(string, uppercase_first_letter=True):
+    # 'inflection' is only imported if the filter is used
+    from inflection import camelize
+
+    return camelize(string, uppercase_first_letter=uppercase_first_letter)
+
+
+def latex_escape(value):
+    """Escape the LaTeX special characters of a value, unless it has already
+    been escaped or it is marked as LaTeX."""
+    return escape_latex(value)
+
+
+def _sort_key(value):
+    # numbers, like years, are sorted by their value before other values
+    value = str(value)
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
+
+
+def bib_entry(bibdb, key, default=None):
+    """Entry of a bibliography database by citation key."""
+    return bibdb.by_key.get(key, default)
+
+
+def bib_entries(bibdb, keys):
+    """Entries of a bibliography database by citation keys, ignoring the
+    keys which are not in the database."""
+    return [bibdb.by_key[key] for key in keys if key in bibdb.by_key]
+
+
+def bib_year(bibdb, year):
+    """Entries of a bibliography database published in a year."""
+    return bibdb.by_year.get(str(year).strip(), [])
+
+
+def bib_author(bibdb, author):
+    """Entries of a bibliography database written by an author, as written
+    in the ``author`` fields."""
+    return bibdb.by_author.get(" ".join(author.split()), [])
+
+
+def bib_sort(entries, field="year", reverse=False):
+    """Sort bibliography entries, or all the entries of a bibliography
+    database, by a field, placing the entries without it at the end."""
+    entries = getattr(entries, "entries", entries)
+    response = sorted(
+        (entry for entry in entries if field in entry),
+        key=lambda entry: _sort_key(entry[field]),
+        reverse=reverse,
+    )
+    response.extend(entry for entry in entries if field not in entry)
+    return response
+
+
+def bib_group(bibdb, index="year", reverse=False):
+    """Entries of a bibliography database grouped by ``year`` or ``author``,
+    as ``(value, entries)`` pairs sorted by value."""
+    if index not in ("year", "author"):
+        raise ValueError("Bibliography entries can't be grouped by '%s'" % index)
+    groups = bibdb.by_year if index == "year" else bibdb.by_author
+    return sorted(
+        groups.items(), key=lambda item: _sort_key(item[0]), reverse=reverse
+    )
 
 
 DEFAULT_FILTERS = {
     "camelize": camelize,
+    "latex_escape": latex_escape,
+    "bib_entry": bib_entry,
+    "bib_entries": bib_entries,
+    "bib_year": bib_year,
+    "bib_author": bib_author,
+    "bib_sort": bib_sort,
+    "bib_group": bib_group,
 }
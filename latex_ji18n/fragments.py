@@ -0,0 +1,180 @@
+"""Cache of the output of expensive blocks of templates, like big tables or
+bibliography listings which are the same for most languages::
+
+    \\BLOCK{cache "publications", _bibdb.by_year|length}
+    ...
+    \\BLOCK{endcache}
+
+The output of a block is cached by the path of its template, so the
+projects built by the same environment don't share it, by its source and
+by the values passed to the ``cache`` tag, which must include every
+variable used by the block that can change its output, like the language
+if the block is translated. Values are compared by their JSON
+representation.
+
+Fragments are kept in memory by a LRU cache and, optionally, on disk, so
+they are reused by later builds, removing the least recently used ones
+when the size of the directory exceeds a limit.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import threading
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+# changing it invalidates all the fragments cached on disk
+FRAGMENTS_VERSION = "2"
+
+
+class FragmentCache:
+    """Rendered fragments by key, keeping the ``max_entries`` most recently
+    used in memory and, if ``dirpath`` is defined, storing them in that
+    directory until its size exceeds ``max_size`` bytes."""
+
+    def __init__(self, max_entries=256, dirpath=None, max_size=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.dirpath = dirpath
+        self.max_size = max_size
+        self._fragments = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        # size of the directory, computed when needed
+        self._size = None
+
+    def _filepath(self, key):
+        return os.path.join(self.dirpath, "%s.tex" % key)
+
+    def _remember(self, key, fragment):
+        with self._lock:
+            self._fragments[key] = fragment
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+
+    def get(self, key):
+        """Returns the fragment stored by key or ``None`` if not cached."""
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                return fragment
+        if self.dirpath is None:
+            return None
+
+        filepath = self._filepath(key)
+        try:
+            with open(filepath, encoding="utf-8") as f:
+                fragment = f.read()
+            # the modification time marks the latest use of the fragment
+            os.utime(filepath)
+        except OSError:
+            return None
+        self._remember(key, fragment)
+        return fragment
+
+    def set(self, key, fragment):
+        self._remember(key, fragment)
+        if self.dirpath is None:
+            return
+
+        if not os.path.exists(self.dirpath):
+            os.makedirs(self.dirpath, exist_ok=True)
+        filepath = self._filepath(key)
+        _tmp_filepath = "%s.%d.%d.tmp" % (
+            filepath, os.getpid(), threading.get_ident()
+        )
+        with open(_tmp_filepath, "w", encoding="utf-8") as f:
+            f.write(fragment)
+        size = os.path.getsize(_tmp_filepath)
+        with self._lock:
+            # the fragment can be stored already, by other language or process
+            try:
+                size -= os.path.getsize(filepath)
+            except OSError:
+                pass
+            os.replace(_tmp_filepath, filepath)
+
+            if self._size is not None:
+                self._size += size
+            if self._size is None or self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Remove the least recently used fragments stored on disk until
+        their size doesn't exceed the maximum size."""
+        fragments = []
+        for entry in os.scandir(self.dirpath):
+            if entry.name.endswith(".tex"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                fragments.append((stat.st_mtime, stat.st_size, entry.path))
+
+        self._size = sum(size for _, size, _ in fragments)
+        for _, size, filepath in sorted(fragments):
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(filepath)
+            except OSError:
+                continue
+            self._size -= size
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the ``cache`` tag, which caches the output of its block in the
+    ``fragment_cache`` of the environment."""
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        values = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            values.append(parser.parse_expression())
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+
+        # the representation of the nodes doesn't include their lines, so
+        # moving the block doesn't change its hash
+        source_md5 = hashlib.md5(repr(body).encode("utf-8")).hexdigest()
+        return nodes.CallBlock(
+            self.call_method(
+                "_cache",
+                [
+                    nodes.Const(parser.filename),
+                    nodes.Const(source_md5),
+                    nodes.List(values),
+                ],
+            ),
+            [],
+            [],
+            body,
+        ).set_lineno(lineno)
+
+    def _cache(self, filepath, source_md5, values, caller):
+        hash_md5 = hashlib.md5(FRAGMENTS_VERSION.encode())
+        if filepath:
+            hash_md5.update(os.path.abspath(filepath).encode())
+        hash_md5.update(source_md5.encode())
+        hash_md5.update(json.dumps(values, sort_keys=True, default=repr).encode())
+        key = hash_md5.hexdigest()
+
+        fragment = self.environment.fragment_cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            self.environment.fragment_cache.set(key, fragment)
+        return fragment
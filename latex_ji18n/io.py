@@ -1,11 +1,163 @@
 import hashlib
+import itertools
+import os
+import pickle
+import shutil
+import threading
 
-import ruamel.yaml as yaml
+from latex_ji18n.latex import RawLatex, escape_latex_data
 
 
-def read_yaml_file(filepath, default_content={}):
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = yaml.safe_load(f) or default_content
+# parsed YAML files by filepath and if they are escaped: (modification time,
+# size, MD5, content)
+_yaml_files_cache = {}
+
+_yaml_loaders = threading.local()
+
+
+def _construct_raw_latex(constructor, node):
+    return RawLatex(constructor.construct_scalar(node))
+
+
+def _yaml_loader():
+    # uses the libyaml based parser of 'ruamel.yaml.clib' if it is
+    # installed, otherwise falls back to the pure Python implementation
+    if not hasattr(_yaml_loaders, "loader"):
+        import ruamel.yaml as yaml
+        from ruamel.yaml.constructor import SafeConstructor
+
+        # the '!latex' tag marks the strings which are already LaTeX,
+        # registered in a subclass to not modify the constructor of others
+        class LatexConstructor(SafeConstructor):
+            pass
+
+        LatexConstructor.add_constructor("!latex", _construct_raw_latex)
+
+        _yaml_loaders.loader = yaml.YAML(typ="safe")
+        _yaml_loaders.loader.Constructor = LatexConstructor
+    return _yaml_loaders.loader
+
+
+def read_pickle_file(filepath):
+    """Returns the object stored in a pickle file or ``None`` if the file
+    doesn't exist or can't be read."""
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with open(filepath, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def write_pickle_file(filepath, obj):
+    """Atomically stores an object in a pickle file, creating its directory
+    if needed."""
+    dirpath = os.path.dirname(filepath)
+    if not os.path.exists(dirpath):
+        os.makedirs(dirpath, exist_ok=True)
+    _tmp_filepath = "%s.%d.tmp" % (filepath, os.getpid())
+    with open(_tmp_filepath, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(_tmp_filepath, filepath)
+
+
+def copy_file(src, dst):
+    """Atomically copy a file, so the destination is never incomplete."""
+    _tmp_dst = "%s.%d.tmp" % (dst, os.getpid())
+    try:
+        shutil.copyfile(src, _tmp_dst)
+        os.replace(_tmp_dst, dst)
+    finally:
+        if os.path.exists(_tmp_dst):
+            os.remove(_tmp_dst)
+
+
+def move_file(src, dst):
+    """Atomically move a file, even to other filesystem."""
+    try:
+        os.replace(src, dst)
+    except OSError:
+        # in other filesystem
+        copy_file(src, dst)
+        os.remove(src)
+
+
+def write_file_if_changed(filepath, chunks, encoding="utf-8",
+                          chunks_per_write=4096):
+    """Write the text chunks yielded by an iterable to a file, joining
+    ``chunks_per_write`` chunks in each write, without modifying the file if
+    its content doesn't change. Returns if the file has been modified."""
+    chunks = iter(chunks)
+    previous_file = open(filepath, "rb") if os.path.exists(filepath) else None
+    unchanged = previous_file is not None
+    _tmp_filepath = "%s.%d.tmp" % (filepath, os.getpid())
+    try:
+        with open(_tmp_filepath, "wb") as f:
+            while True:
+                batch = list(itertools.islice(chunks, chunks_per_write))
+                if not batch:
+                    break
+                data = "".join(batch).encode(encoding)
+                if unchanged:
+                    unchanged = previous_file.read(len(data)) == data
+                f.write(data)
+        if unchanged and not previous_file.read(1):
+            return False
+        if previous_file is not None:
+            previous_file.close()
+            previous_file = None
+        os.replace(_tmp_filepath, filepath)
+        return True
+    finally:
+        if previous_file is not None:
+            previous_file.close()
+        if os.path.exists(_tmp_filepath):
+            os.remove(_tmp_filepath)
+
+
+def read_yaml_file(filepath, default_content={}, cache_dirpath=None,
+                   latex_escape=False):
+    """Parse a YAML file. Parsed files are cached in memory by their path,
+    modification time, size and content hash and, if ``cache_dirpath`` is
+    defined, on disk by their content hash, so the returned content must not
+    be modified.
+
+    If ``latex_escape`` is ``True``, the LaTeX special characters of the
+    strings of the file are escaped, except in the strings tagged as
+    ``!latex``.
+    """
+    stat = os.stat(filepath)
+    _cached = _yaml_files_cache.get((filepath, latex_escape))
+    if _cached is not None and _cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return _cached[3]
+
+    md5 = file_md5(filepath)
+    if _cached is not None and _cached[2] == md5:
+        content = _cached[3]
+    else:
+        content, cache_filepath = None, None
+        if cache_dirpath:
+            import ruamel.yaml as yaml
+
+            cache_filepath = os.path.join(
+                cache_dirpath, "%s-%s%s.pickle" % (
+                    md5, yaml.__version__, "-latex" if latex_escape else ""
+                )
+            )
+            content = read_pickle_file(cache_filepath)
+
+        if content is None:
+            with open(filepath, "r", encoding="utf-8") as f:
+                content = _yaml_loader().load(f) or default_content
+            if latex_escape:
+                content = escape_latex_data(content)
+            if cache_filepath:
+                write_pickle_file(cache_filepath, content)
+
+    _yaml_files_cache[(filepath, latex_escape)] = (
+        stat.st_mtime_ns, stat.st_size, md5, content
+    )
     return content
 
 
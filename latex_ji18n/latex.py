@@ -0,0 +1,49 @@
+"""Escaping of the characters with a special meaning in LaTeX. Strings which
+are already LaTeX are marked as :py:class:`RawLatex`, so they are never
+escaped, which in YAML files is done with the ``!latex`` tag::
+
+    title: Research & development
+    signature: !latex \\textsc{R\\&D}
+"""
+
+
+LATEX_SPECIAL_CHARACTERS = {
+    "&": r"\&",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+    "\\": r"\textbackslash{}",
+}
+
+_LATEX_ESCAPE_TABLE = str.maketrans(LATEX_SPECIAL_CHARACTERS)
+
+
+class RawLatex(str):
+    """String which is already LaTeX, so it is not escaped."""
+
+    __slots__ = ()
+
+
+def escape_latex(value):
+    """Escape the LaTeX special characters of a value converted to string,
+    returning it as :py:class:`RawLatex`, unless it is already LaTeX."""
+    if isinstance(value, RawLatex):
+        return value
+    return RawLatex(str(value).translate(_LATEX_ESCAPE_TABLE))
+
+
+def escape_latex_data(data):
+    """Returns a copy of some data, like the content of a YAML file, with
+    the LaTeX special characters of all their strings escaped."""
+    if isinstance(data, str):
+        return escape_latex(data)
+    elif isinstance(data, dict):
+        return {key: escape_latex_data(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [escape_latex_data(value) for value in data]
+    return data
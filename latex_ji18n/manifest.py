@@ -0,0 +1,94 @@
+"""Build manifest, which stores the content hashes of the inputs of each
+language in its latest successful build, so unchanged languages can be
+skipped by the next builds. The inputs are the files used to render the
+template of the language and the files read by LaTeX compiling it, which
+are called dependencies.
+"""
+
+import json
+import os
+
+from latex_ji18n.io import file_md5
+
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def files_md5(filepaths, relative_to=None):
+    """Returns a dictionary with the MD5 hashes of the existent files,
+    optionally using paths relative to ``relative_to`` as keys.
+    """
+    response = {}
+    for filepath in filepaths:
+        if not os.path.exists(filepath):
+            continue
+        key = filepath
+        if relative_to:
+            key = os.path.relpath(filepath, relative_to)
+        response[key] = file_md5(filepath)
+    return response
+
+
+class BuildManifest:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.languages = {}
+        if os.path.exists(filepath):
+            try:
+                with open(filepath, "r", encoding="utf-8") as f:
+                    self.languages = json.load(f).get("languages", {})
+            except ValueError:
+                # corrupted manifest, everything will be built again
+                self.languages = {}
+
+    def dependencies(self, language):
+        """Returns the paths of the files recorded by LaTeX as read in the
+        latest build of a language."""
+        entry = self.languages.get(language)
+        if entry is None:
+            return []
+        return list(entry.get("dependencies", {}))
+
+    def is_up_to_date(
+        self,
+        language,
+        inputs,
+        commands,
+        output_filepath,
+        dependencies={},
+        options={},
+    ):
+        """Checks if a language was built successfully by the same commands
+        pipe with the same inputs, dependencies and options which change its
+        output, and if its output still exists.
+        """
+        entry = self.languages.get(language)
+        if entry is None or not os.path.exists(output_filepath):
+            return False
+        return (
+            entry["commands"] == list(commands)
+            and entry["inputs"] == inputs
+            and entry.get("dependencies", {}) == dependencies
+            and entry.get("options", {}) == options
+        )
+
+    def update(self, language, inputs, commands, dependencies={}, options={}):
+        self.languages[language] = {
+            "commands": list(commands),
+            "inputs": inputs,
+            "dependencies": dependencies,
+            "options": options,
+        }
+
+    def discard(self, language):
+        self.languages.pop(language, None)
+
+    def save(self):
+        dirpath = os.path.dirname(self.filepath)
+        if not os.path.exists(dirpath):
+            os.makedirs(dirpath)
+
+        _tmp_filepath = "%s.tmp" % self.filepath
+        with open(_tmp_filepath, "w", encoding="utf-8") as f:
+            json.dump({"languages": self.languages}, f, indent=2, sort_keys=True)
+        os.replace(_tmp_filepath, self.filepath)
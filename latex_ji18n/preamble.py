@@ -0,0 +1,144 @@
+"""Precompiled preambles. The preamble of a document, everything before
+``\\begin{document}``, is dumped into a LaTeX format file that is cached
+by the hash of the preamble, so the next runs start from that format
+instead of loading all the packages of the preamble again.
+
+The files of the project read dumping a format, like local packages or
+files included by the preamble, are recorded with their content hashes
+next to it, so the format is dumped again when some of them changes.
+"""
+
+import hashlib
+import json
+import os
+
+from latex_ji18n.io import file_md5
+from latex_ji18n.manifest import files_md5
+from latex_ji18n.recorder import read_recorder_file
+
+
+BEGIN_DOCUMENT = "\\begin{document}"
+
+
+def split_preamble(source):
+    """Split the source of a document into its preamble and its body, which
+    starts with ``\\begin{document}``. Returns ``None`` if the document has
+    no body."""
+    index = source.find(BEGIN_DOCUMENT)
+    if index == -1:
+        return None
+    return source[:index], source[index:]
+
+
+class PreambleFormatCache:
+    """Format files of preambles stored in a directory."""
+
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+
+    def format_name(self, preamble, executable):
+        hash_md5 = hashlib.md5(preamble.encode("utf-8"))
+        # formats are only valid for the executable that dumped them
+        binary = os.path.realpath(executable.binary)
+        hash_md5.update(("%s %s" % (binary, os.path.getmtime(binary))).encode())
+        return "preamble-%s" % hash_md5.hexdigest()
+
+    def _dependencies_filepath(self, name):
+        return os.path.join(self.dirpath, "%s.json" % name)
+
+    def dependencies(self, name, root_dirpath):
+        """Returns the content hashes of the files inside ``root_dirpath``
+        read dumping a format, by their paths relative to it, or ``None``
+        if they were not recorded."""
+        try:
+            with open(self._dependencies_filepath(name), encoding="utf-8") as f:
+                dependencies = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if dependencies.get("root") != root_dirpath:
+            return None
+        return dependencies["files"]
+
+    def is_up_to_date(self, name, root_dirpath):
+        """Checks if a format exists and the files inside ``root_dirpath``
+        read dumping it have not changed."""
+        if not os.path.exists(os.path.join(self.dirpath, "%s.fmt" % name)):
+            return False
+        dependencies = self.dependencies(name, root_dirpath)
+        if dependencies is None:
+            return False
+        for relpath, md5 in dependencies.items():
+            filepath = os.path.join(root_dirpath, relpath)
+            if not os.path.isfile(filepath) or file_md5(filepath) != md5:
+                return False
+        return True
+
+    def env(self, env=None):
+        """Environment variables needed to find the cached formats, added to
+        ``env`` or to the environment of the current process."""
+        return dict(env or os.environ, TEXFORMATS=self.dirpath + os.pathsep)
+
+    async def aget(self, preamble, executable, cwd=None, log_filepath=None,
+                   timeout=None, root_dirpath=None):
+        """Returns the name of the format of a preamble, dumping it with a
+        LaTeX executable if it is not cached or the files inside
+        ``root_dirpath`` (by default, ``cwd``) read dumping it have changed,
+        or ``None`` if the preamble can't be dumped."""
+        root_dirpath = os.path.abspath(root_dirpath or cwd or os.getcwd())
+        name = self.format_name(preamble, executable)
+        if self.is_up_to_date(name, root_dirpath):
+            return name
+
+        if not os.path.exists(self.dirpath):
+            os.makedirs(self.dirpath, exist_ok=True)
+
+        # dumped with a temporary name, so concurrent builds dumping the
+        # same preamble don't read incomplete formats
+        jobname = "%s-%d" % (name, os.getpid())
+        ini_filepath = os.path.join(self.dirpath, "%s.tex" % jobname)
+        with open(ini_filepath, "w", encoding="utf-8") as f:
+            f.write(preamble)
+            f.write("\n\\dump\n")
+
+        try:
+            returncode = await executable.adump_format(
+                ini_filepath,
+                jobname,
+                self.dirpath,
+                cwd=cwd,
+                log_filepath=log_filepath,
+                timeout=timeout,
+            )
+            fmt_filepath = os.path.join(self.dirpath, "%s.fmt" % jobname)
+            fls_filepath = os.path.join(self.dirpath, "%s.fls" % jobname)
+            if returncode != 0 or not os.path.exists(fmt_filepath) or (
+                not os.path.exists(fls_filepath)
+            ):
+                return None
+            # the files of the cache, like the preamble dumped, are ignored
+            dirpath = os.path.abspath(self.dirpath)
+            dependencies = files_md5(
+                [
+                    filepath for filepath in read_recorder_file(fls_filepath)
+                    if filepath.startswith(root_dirpath + os.sep)
+                    and not filepath.startswith(dirpath + os.sep)
+                ],
+                relative_to=root_dirpath,
+            )
+            with open(self._dependencies_filepath(jobname), "w",
+                      encoding="utf-8") as f:
+                json.dump({"root": root_dirpath, "files": dependencies}, f)
+
+            # the format is replaced before its dependencies, so it is never
+            # used with the dependencies of a previous format
+            os.replace(fmt_filepath, os.path.join(self.dirpath, "%s.fmt" % name))
+            os.replace(
+                self._dependencies_filepath(jobname),
+                self._dependencies_filepath(name),
+            )
+            return name
+        finally:
+            for extension in (".tex", ".log", ".fls", ".fmt", ".json"):
+                filepath = os.path.join(self.dirpath, jobname + extension)
+                if os.path.exists(filepath):
+                    os.remove(filepath)
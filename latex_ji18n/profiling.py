@@ -0,0 +1,156 @@
+"""Profiling of builds. While a :py:class:`Profiler` is enabled, the phases
+of the builds are recorded as spans with their wall time, the CPU time
+spent by the process and its children and the peak resident set size of
+the process. Spans are written as Chrome trace events, which can be
+opened with ``chrome://tracing`` or https://ui.perfetto.dev.
+
+Optionally, the Python code executed is profiled with :py:mod:`cProfile`.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# profiler enabled in the current process
+_profiler = None
+
+
+def _cpu_times():
+    """CPU time in seconds spent by the process and by its children."""
+    if resource is None:
+        return time.process_time(), 0.0
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        self_usage.ru_utime + self_usage.ru_stime,
+        children_usage.ru_utime + children_usage.ru_stime,
+    )
+
+
+def _max_rss_kb():
+    """Peak resident set size of the process in kilobytes."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes in macOS, kilobytes in the rest of platforms
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+class _Stats:
+    """Statistics of :py:mod:`cProfile` which can be added to
+    :py:class:`pstats.Stats`."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class Profiler:
+    """Records spans and, if ``cprofile`` is ``True``, profiles the Python
+    code executed while it is enabled."""
+
+    def __init__(self, cprofile=False):
+        self.spans = []
+        self.stats = []
+        self.cprofile = None
+        if cprofile:
+            import cProfile
+
+            self.cprofile = cProfile.Profile()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, category="build", **args):
+        start = time.perf_counter_ns()
+        cpu_start, children_cpu_start = _cpu_times()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter_ns()
+            cpu_end, children_cpu_end = _cpu_times()
+            args["cpu_ms"] = round((cpu_end - cpu_start) * 1000, 3)
+            args["children_cpu_ms"] = round(
+                (children_cpu_end - children_cpu_start) * 1000, 3
+            )
+            args["max_rss_kb"] = _max_rss_kb()
+            self.record([{
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }])
+
+    def record(self, spans, stats=None):
+        """Add the spans and the :py:mod:`cProfile` statistics recorded by
+        other profiler, like the profilers of other processes."""
+        with self._lock:
+            self.spans.extend(spans)
+            if stats:
+                self.stats.append(stats)
+
+    def enable(self):
+        global _profiler
+        _profiler = self
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def disable(self):
+        global _profiler
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if _profiler is self:
+            _profiler = None
+
+    def cprofile_stats(self):
+        """Returns the :py:mod:`cProfile` statistics recorded by the profiler
+        as a picklable dictionary, or ``None`` if not profiled."""
+        if self.cprofile is None:
+            return None
+        self.cprofile.create_stats()
+        return self.cprofile.stats
+
+    def write_trace(self, filepath):
+        """Write the spans as Chrome trace events in a JSON file."""
+        spans = sorted(self.spans, key=lambda span: span["ts"])
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": spans, "displayTimeUnit": "ms"}, f)
+
+    def dump_stats(self, filepath):
+        """Write the :py:mod:`cProfile` statistics of the profiler and of the
+        profilers recorded by it, to be read by :py:mod:`pstats`."""
+        import pstats
+
+        stats = pstats.Stats(_Stats(self.cprofile_stats()))
+        for other_stats in self.stats:
+            stats.add(_Stats(other_stats))
+        stats.dump_stats(filepath)
+
+
+def enabled_profiler():
+    """Returns the profiler enabled in the current process, if any."""
+    return _profiler
+
+
+def span(name, category="build", **args):
+    """Context manager which records a span in the enabled profiler, doing
+    nothing if no profiler is enabled. Yields a dictionary of arguments of
+    the span which can be updated inside the context."""
+    if _profiler is None:
+        return contextlib.nullcontext(args)
+    return _profiler.span(name, category=category, **args)
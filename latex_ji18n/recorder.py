@@ -0,0 +1,24 @@
+"""Read the files recorded by LaTeX executables ran with the ``-recorder``
+option, which writes the files read and written by them in a ``.fls``
+file.
+"""
+
+import os
+
+
+def read_recorder_file(filepath):
+    """Returns the absolute paths of the files read by LaTeX according to
+    a ``.fls`` file, except those which are also written by it, like the
+    ``.aux`` file.
+    """
+    pwd, inputs, outputs = os.path.dirname(filepath), {}, set()
+    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("PWD "):
+                pwd = line[4:]
+            elif line.startswith("INPUT "):
+                inputs[os.path.normpath(os.path.join(pwd, line[6:]))] = None
+            elif line.startswith("OUTPUT "):
+                outputs.add(os.path.normpath(os.path.join(pwd, line[7:])))
+    return [path for path in inputs if path not in outputs]
@@ -1,10 +1,14 @@
+import collections
+import concurrent.futures
 import inspect
 import os
 
-from jinja2 import FileSystemLoader
+from jinja2 import FileSystemLoader, meta
 
+from latex_ji18n import profiling
 from latex_ji18n.environment import LatexJinja2Environment
 from latex_ji18n.filters import DEFAULT_FILTERS
+from latex_ji18n.io import write_file_if_changed
 
 
 class LatexJinja2Renderer:
@@ -14,13 +18,135 @@ class LatexJinja2Renderer:
             self.environment = self.environment()
         self.environment.filters.update(filters)
 
-    def render(self, filepath, context={}, destpath=None):
+        # loaders by search path, reused to keep the templates cache
+        self._loaders = {}
+
+        # analysis of templates by filepath: (modification times of
+        # the templates involved, undeclared variables)
+        self._undeclared_variables = {}
+
+    def _loader(self, searchpath):
+        if searchpath not in self._loaders:
+            self._loaders[searchpath] = FileSystemLoader(searchpath=searchpath)
+        return self._loaders[searchpath]
+
+    def _analyze(self, filepath):
+        """Returns the modification times of the files of a template and the
+        templates included by it, and their undeclared variables."""
+        _cached = self._undeclared_variables.get(filepath)
+        if _cached is not None and all(
+            os.path.exists(path) and os.path.getmtime(path) == mtime
+            for path, mtime in _cached[0].items()
+        ):
+            return _cached
+
+        loader = self._loader(os.path.abspath(os.path.dirname(filepath)))
+        mtimes, variables = {}, set()
+        pending, processed = [os.path.basename(filepath)], set()
+        while pending:
+            name = pending.pop()
+            if name in processed:
+                continue
+            processed.add(name)
+
+            source, path, _ = loader.get_source(self.environment, name)
+            mtimes[path] = os.path.getmtime(path)
+            ast = self.environment.parse(source)
+            if variables is not None:
+                variables |= meta.find_undeclared_variables(ast)
+            for referenced_name in meta.find_referenced_templates(ast):
+                if referenced_name is None:
+                    variables = None
+                else:
+                    pending.append(referenced_name)
+
+        self._undeclared_variables[filepath] = (mtimes, variables)
+        return self._undeclared_variables[filepath]
+
+    def undeclared_variables(self, filepath):
+        """Returns the names of the variables used by a template and the
+        templates included by it which are not defined by them, or ``None``
+        if some template is included dynamically so they can't be known.
+        """
+        return self._analyze(filepath)[1]
+
+    def template_filepaths(self, filepath):
+        """Returns the paths of a template and the templates included by it,
+        except those which are included dynamically."""
+        return list(self._analyze(filepath)[0])
+
+    def _template(self, filepath):
         filedir = os.path.abspath(os.path.dirname(filepath))
-        filename = os.path.basename(filepath)
-        self.environment.loader = FileSystemLoader(searchpath=filedir)
-        template = self.environment.get_template(filename)
-        output = template.render(**context)
-        if destpath:
-            with open(destpath, "w", encoding="utf-8") as f:
-                f.write(output)
+        self.environment.loader = self._loader(filedir)
+        return self.environment.get_template(os.path.basename(filepath))
+
+    def generate(self, filepath, context={}):
+        """Yields the chunks of the output of a template. The context is
+        looked up directly instead of being copied."""
+        return self._generate(self._template(filepath), context)
+
+    def _generate(self, template, context):
+        # Jinja copies the first layer to report errors, which is empty
+        # so the context is never copied
+        jinja2_context = template.new_context(
+            collections.ChainMap({}, context, template.globals), shared=True
+        )
+        try:
+            yield from template.root_render_func(jinja2_context)
+        except Exception:
+            self.environment.handle_exception()
+
+    def render(self, filepath, context={}, destpath=None):
+        """Returns the output of a template, writing it also to ``destpath``
+        if defined. Use :py:meth:`stream` to write big outputs."""
+        with profiling.span(
+            "LatexJinja2Renderer.render", "render", template=filepath,
+            destpath=destpath
+        ):
+            output = self.environment.concat(self.generate(filepath, context))
+            if destpath:
+                with open(destpath, "w", encoding="utf-8") as f:
+                    f.write(output)
         return output
+
+    def stream(self, filepath, destpath, context={}):
+        """Write the output of a template to a file as it is generated,
+        without modifying the file if the output has not changed. Returns
+        if the file has been modified."""
+        return self._stream(self._template(filepath), destpath, context)
+
+    def _stream(self, template, destpath, context):
+        with profiling.span(
+            "LatexJinja2Renderer.stream", "render", template=template.filename,
+            destpath=destpath
+        ) as args:
+            args["modified"] = write_file_if_changed(
+                destpath, self._generate(template, context)
+            )
+        return args["modified"]
+
+    def render_many(self, filepath, contexts, max_workers=None):
+        """Render a template with the language contexts of a dictionary by
+        language, streaming each output to the localized file of its
+        language. The template is loaded once and the languages are rendered
+        by a pool of ``max_workers`` threads. Returns the exceptions raised
+        rendering the languages that failed, by language.
+        """
+        template = self._template(filepath)
+        errors = {}
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._stream,
+                    template,
+                    context.localized_tex_filepath,
+                    context,
+                ): language
+                for language, context in contexts.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                if future.exception() is not None:
+                    errors[futures[future]] = future.exception()
+        return errors
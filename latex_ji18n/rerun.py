@@ -0,0 +1,131 @@
+"""Decide when LaTeX or biber must be executed again. LaTeX is executed
+again if its log asks for it or if some of the auxiliary files written
+by LaTeX has changed in the latest run. Biber is only executed when
+the ``.bcf`` file written by LaTeX, or the data sources listed by it
+(the ``.bib`` files), have changed since biber processed them.
+"""
+
+import hashlib
+import html
+import os
+import re
+
+from latex_ji18n.io import file_md5
+
+
+# auxiliary files read by LaTeX in the next run
+AUXILIARY_EXTENSIONS = (".aux", ".toc", ".lof", ".lot", ".out", ".nav", ".snm",
+                        ".bbl")
+
+RERUN_REGEX = re.compile(
+    r"(Rerun to get|Please rerun LaTeX|Label\(s\) may have changed"
+    r"|\(rerunfilecheck\).*[Rr]erun)"
+)
+
+BCF_DATASOURCE_REGEX = re.compile(
+    r"<bcf:datasource[^>]*>\s*([^<]+?)\s*</bcf:datasource>"
+)
+
+
+def aux_file_md5(filepath):
+    """MD5 of an ``.aux`` file ignoring its comments, which don't change
+    the output of the next runs."""
+    hash_md5 = hashlib.md5()
+    with open(filepath, "rb") as f:
+        for line in f:
+            if not line.lstrip().startswith(b"%"):
+                hash_md5.update(line)
+    return hash_md5.hexdigest()
+
+
+def bcf_datasources(filepath):
+    """Paths of the data sources listed by a ``.bcf`` file, as written."""
+    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+        return [
+            html.unescape(datasource)
+            for datasource in BCF_DATASOURCE_REGEX.findall(f.read())
+        ]
+
+
+class RerunPlanner:
+    """Decides the runs of the commands building a job in a directory. The
+    data sources of biber are found relative to ``source_dirpath``, the
+    directory in which the commands are executed."""
+
+    def __init__(self, dirpath, jobname, source_dirpath=None):
+        self.dirpath = dirpath
+        self.jobname = jobname
+        self.source_dirpath = source_dirpath or dirpath
+
+        self._snapshot = self.auxiliary_files_md5()
+
+        # .bcf and data sources processed by the latest biber run, stored
+        # next to the .bcf
+        self._biber_key = None
+        if os.path.exists(self._filepath(".bcf.md5")):
+            with open(self._filepath(".bcf.md5"), "r") as f:
+                self._biber_key = f.read().strip()
+
+    def _filepath(self, extension):
+        return os.path.join(self.dirpath, self.jobname + extension)
+
+    def auxiliary_files_md5(self):
+        response = {}
+        for extension in AUXILIARY_EXTENSIONS:
+            filepath = self._filepath(extension)
+            if os.path.exists(filepath):
+                response[extension] = (
+                    aux_file_md5(filepath) if extension == ".aux"
+                    else file_md5(filepath)
+                )
+        return response
+
+    def snapshot(self):
+        """Store the state of the auxiliary files before a LaTeX run."""
+        self._snapshot = self.auxiliary_files_md5()
+
+    def log_requests_rerun(self):
+        log_filepath = self._filepath(".log")
+        if not os.path.exists(log_filepath):
+            return False
+        with open(log_filepath, "r", encoding="utf-8", errors="replace") as f:
+            return RERUN_REGEX.search(f.read()) is not None
+
+    def needs_rerun(self):
+        """Checks if LaTeX must be executed again after its latest run."""
+        return (
+            self.log_requests_rerun()
+            or self.auxiliary_files_md5() != self._snapshot
+        )
+
+    def biber_key(self):
+        """Hash of the ``.bcf`` file and the content of its data sources,
+        which define the output of biber. Data sources not found in the
+        source directory, like those found by kpathsea, are hashed by name.
+        """
+        bcf_filepath = self._filepath(".bcf")
+        hash_md5 = hashlib.md5(file_md5(bcf_filepath).encode("utf-8"))
+        for datasource in bcf_datasources(bcf_filepath):
+            filepath = os.path.join(self.source_dirpath, datasource)
+            hash_md5.update(datasource.encode("utf-8"))
+            if os.path.isfile(filepath):
+                hash_md5.update(file_md5(filepath).encode("utf-8"))
+        return hash_md5.hexdigest()
+
+    def needs_biber(self):
+        """Checks if the ``.bcf`` file or its data sources have changed since
+        biber processed them."""
+        if not os.path.exists(self._filepath(".bcf")):
+            return False
+        return self.biber_key() != self._biber_key
+
+    def biber_is_up_to_date(self):
+        """Checks if biber has processed the current ``.bcf`` file and its
+        data sources."""
+        return os.path.exists(self._filepath(".bcf")) and not self.needs_biber()
+
+    def biber_ran(self):
+        if os.path.exists(self._filepath(".bcf")):
+            self._biber_key = self.biber_key()
+            with open(self._filepath(".bcf.md5"), "w") as f:
+                f.write(self._biber_key)
@@ -14,13 +14,13 @@ PACKAGE_NAME = PROJECT_NAME.replace('-', '_')
 URL = 'https://github.com/mondeja/%s' % PROJECT_NAME
 EMAIL = 'mondejar1994@gmail.com'
 AUTHOR = 'Álvaro Mondéjar Rubio'
-REQUIRES_PYTHON = '>=3'
+REQUIRES_PYTHON = '>=3.7'
 
 REQUIRED = [
     'jinja2>=2.11.2',
     'inflection>=0.5.1',
     'ruamel.yaml>=0.16.10',
-    'click>=7.1.2',
+    'click>=8.0',
     'bibtexparser>=1.2.0',
 ]
 
@@ -37,6 +37,14 @@ DEV_EXTRAS = [
     'pre-commit==2.12.1',
 ]
 
+TEST_EXTRAS = [
+    'pytest>=6.2.4',
+]
+
+WATCH_EXTRAS = [
+    'inotify_simple>=1.3.5',
+]
+
 HERE = os.path.abspath(os.path.dirname(__file__))
 
 with io.open(os.path.join(HERE, 'README.md'), encoding='utf-8') as f:
@@ -116,6 +124,8 @@ setup(
     extras_require={
         'dev': DEV_EXTRAS,
         'lint': LINT_EXTRAS,
+        'test': TEST_EXTRAS,
+        'watch': WATCH_EXTRAS,
     },
     include_package_data=True,
     license='BSD License',
@@ -125,7 +135,6 @@ setup(
         'Operating System :: OS Independent',
         'Development Status :: 4 - Beta',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',
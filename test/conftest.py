@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from latex_ji18n.__main__ import cli
+
+
+STUBS_DIRPATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "stubs",
+)
+
+
+@pytest.fixture(autouse=True)
+def stubs(monkeypatch):
+    """Run the stubs of pdflatex and biber instead of TeX."""
+    monkeypatch.setenv(
+        "PATH", "%s%s%s" % (STUBS_DIRPATH, os.pathsep, os.environ["PATH"])
+    )
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    monkeypatch.delenv("LATEX_JI18N_ARTIFACT_CACHE", raising=False)
+    monkeypatch.delenv("LATEX_JI18N_BUILD_DIR", raising=False)
+
+
+@pytest.fixture
+def create_project(tmp_path):
+    """Write the files of a project, by path relative to the project, into
+    a temporary directory and return its path."""
+
+    def _create_project(name="project", files={}):
+        project_path = tmp_path / name
+        for filename, content in files.items():
+            filepath = project_path / filename
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            filepath.write_text(content, encoding="utf-8")
+        (project_path / "dist").mkdir(exist_ok=True)
+        return str(project_path)
+
+    return _create_project
+
+
+@pytest.fixture
+def build():
+    """Run the ``build`` command with the arguments passed."""
+
+    def _build(*args):
+        return CliRunner().invoke(
+            cli, ["build"] + list(args), catch_exceptions=False
+        )
+
+    return _build
+
+
+def read_pdf(project_path, language):
+    with open(
+        os.path.join(project_path, "dist", "%s.pdf" % language), encoding="utf-8"
+    ) as f:
+        return f.read()
@@ -0,0 +1,44 @@
+import os
+
+from conftest import read_pdf
+
+
+TEMPLATE = (
+    "\\documentclass{article}\n"
+    "\\usepackage{biblatex}\n"
+    "\\addbibresource{refs.bib}\n"
+    "\\begin{document}\n"
+    "\\VAR{title}\n"
+    "\\printbibliography\n"
+    "\\end{document}\n"
+)
+
+
+def test_bib_change_misses_artifact_cache(create_project, build, tmp_path):
+    project_path = create_project(files={
+        "_i18n/en.yml": "title: Title\n",
+        "src/template.tex": TEMPLATE,
+        "src/refs.bib": "@book{knuth84, title = {The TeXbook}}\n",
+    })
+    args = [
+        "-c", "pdflatex,biber,pdflatex",
+        "--artifact-cache", str(tmp_path / "artifacts"),
+        project_path,
+    ]
+
+    result = build(*args)
+    assert result.exit_code == 0, result.output
+    assert "en: built" in result.output
+
+    # unchanged inputs are restored from the artifact cache
+    os.remove(os.path.join(project_path, "dist", "en.pdf"))
+    result = build("--force", *args)
+    assert result.exit_code == 0, result.output
+    assert "en: restored from the artifact cache" in result.output
+
+    with open(os.path.join(project_path, "src", "refs.bib"), "a") as f:
+        f.write("@book{lamport94, title = {LaTeX}}\n")
+    result = build(*args)
+    assert result.exit_code == 0, result.output
+    assert "en: built" in result.output
+    assert "Title" in read_pdf(project_path, "en")
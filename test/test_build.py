@@ -0,0 +1,29 @@
+from conftest import read_pdf
+
+
+TEMPLATE = (
+    "\\documentclass{article}\n"
+    "\\begin{document}\n"
+    "\\VAR{title}\n"
+    "\\end{document}\n"
+)
+
+
+def test_latex_escape_change_builds_again(create_project, build):
+    project_path = create_project(files={
+        "_i18n/en.yml": "title: R&D_50%\n",
+        "src/template.tex": TEMPLATE,
+    })
+
+    result = build(project_path)
+    assert result.exit_code == 0, result.output
+    assert "R&D_50%" in read_pdf(project_path, "en")
+
+    result = build("--latex-escape", project_path)
+    assert result.exit_code == 0, result.output
+    assert "en: built" in result.output
+    assert "R\\&D\\_50\\%" in read_pdf(project_path, "en")
+
+    result = build("--latex-escape", project_path)
+    assert result.exit_code == 0, result.output
+    assert "en: built" not in result.output
@@ -0,0 +1,35 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from latex_ji18n.executable import TIMEOUT_RETURNCODE, ExecutionEngine
+
+
+def is_running(pid):
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            # zombies have finished, but nobody has waited for them
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc"), reason="needs /proc to find the processes"
+)
+def test_timeout_kills_children(tmp_path):
+    pid_filepath = tmp_path / "child.pid"
+    engine = ExecutionEngine(timeout=0.5)
+    returncode = asyncio.run(engine.call(
+        ["sh", "-c", "sleep 30 & echo $! > '%s'; wait" % pid_filepath]
+    ))
+    assert returncode == TIMEOUT_RETURNCODE
+
+    pid = int(pid_filepath.read_text())
+    for _ in range(50):
+        if not is_running(pid):
+            break
+        time.sleep(0.1)
+    assert not is_running(pid)
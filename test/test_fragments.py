@@ -0,0 +1,37 @@
+from conftest import read_pdf
+
+from latex_ji18n.fragments import FragmentCache
+
+
+TEMPLATE = (
+    "\\documentclass{article}\n"
+    "\\begin{document}\n"
+    "\\BLOCK{cache \"table\", language}\\VAR{company}\\BLOCK{endcache}\n"
+    "\\end{document}\n"
+)
+
+
+def test_projects_sharing_template_dont_share_fragments(create_project, build):
+    project_paths = [
+        create_project(name, {
+            "_config/data.yml": "company: %s\n" % company,
+            "_i18n/en.yml": "language: en\n",
+            "src/template.tex": TEMPLATE,
+        })
+        for name, company in (("fa", "Alpha"), ("fb", "Beta"))
+    ]
+
+    result = build(*project_paths)
+    assert result.exit_code == 0, result.output
+
+    assert "Alpha" in read_pdf(project_paths[0], "en")
+    assert "Beta" in read_pdf(project_paths[1], "en")
+    assert "Alpha" not in read_pdf(project_paths[1], "en")
+
+
+def test_overwritten_fragment_size(tmp_path):
+    cache = FragmentCache(dirpath=str(tmp_path / "fragments"))
+    cache.set("key", "a" * 100)
+    cache.set("key", "b" * 100)
+    cache.set("other", "c" * 50)
+    assert cache._size == 150
@@ -0,0 +1,64 @@
+import os
+import stat
+import sys
+
+from conftest import STUBS_DIRPATH
+
+
+TEMPLATE = (
+    "\\documentclass{article}\n"
+    "\\usepackage{biblatex}\n"
+    "\\addbibresource{refs.bib}\n"
+    "\\begin{document}\n"
+    "\\VAR{title}\n"
+    "\\printbibliography\n"
+    "\\end{document}\n"
+)
+
+
+def count_runs(tmp_path, monkeypatch, command):
+    """Count the runs of the stub of a command, returning the file in which
+    they are written."""
+    bin_dirpath = tmp_path / "bin"
+    bin_dirpath.mkdir(exist_ok=True)
+    runs_filepath = tmp_path / ("%s.runs" % command)
+    runs_filepath.write_text("")
+    script_filepath = bin_dirpath / command
+    script_filepath.write_text(
+        "#!/bin/sh\necho run >> '%s'\nexec '%s' '%s' \"$@\"\n" % (
+            runs_filepath, sys.executable, os.path.join(STUBS_DIRPATH, command)
+        )
+    )
+    script_filepath.chmod(script_filepath.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv(
+        "PATH", "%s%s%s" % (bin_dirpath, os.pathsep, os.environ["PATH"])
+    )
+    return runs_filepath
+
+
+def test_warm_build_skips_biber_and_next_pdflatex(
+    create_project, build, tmp_path, monkeypatch
+):
+    project_path = create_project(files={
+        "_i18n/en.yml": "title: Title\n",
+        "src/template.tex": TEMPLATE,
+        "src/refs.bib": "@book{knuth84, title = {The TeXbook}}\n",
+    })
+    args = ["-c", "pdflatex,biber,pdflatex", project_path]
+    result = build(*args)
+    assert result.exit_code == 0, result.output
+
+    pdflatex_runs = count_runs(tmp_path, monkeypatch, "pdflatex")
+    biber_runs = count_runs(tmp_path, monkeypatch, "biber")
+    result = build("--force", *args)
+    assert result.exit_code == 0, result.output
+    assert pdflatex_runs.read_text().count("run") == 1
+    assert biber_runs.read_text().count("run") == 0
+
+    # changing the .bib files runs the whole pipe
+    with open(os.path.join(project_path, "src", "refs.bib"), "a") as f:
+        f.write("@book{lamport94, title = {LaTeX}}\n")
+    result = build(*args)
+    assert result.exit_code == 0, result.output
+    assert pdflatex_runs.read_text().count("run") == 3
+    assert biber_runs.read_text().count("run") == 1
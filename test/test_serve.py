@@ -0,0 +1,75 @@
+import http.client
+import http.server
+import json
+import threading
+
+import pytest
+
+from latex_ji18n.commands.serve import BuildRequestHandler, BuildServer
+
+
+TEMPLATE = (
+    "\\documentclass{article}\n"
+    "\\begin{document}\n"
+    "\\VAR{title}\n"
+    "\\end{document}\n"
+)
+
+
+@pytest.fixture
+def server(create_project):
+    project_path = create_project(files={
+        "_i18n/en.yml": "title: Title\n",
+        "src/template.tex": TEMPLATE,
+    })
+    build_server = BuildServer([project_path])
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), BuildRequestHandler)
+    httpd.daemon_threads = True
+    httpd.build_server = build_server
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    build_server.close()
+
+
+def post(httpd, body, content_length=None):
+    connection = http.client.HTTPConnection(*httpd.server_address, timeout=10)
+    connection.putrequest("POST", "/build")
+    connection.putheader(
+        "Content-Length",
+        str(len(body)) if content_length is None else content_length,
+    )
+    connection.endheaders(body)
+    response = connection.getresponse()
+    try:
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def test_build(server):
+    status, body = post(server, json.dumps({"language": "en"}).encode())
+    assert status == 200
+    assert b"Title" in body
+
+
+@pytest.mark.parametrize("content_length", ("abc", "-1"))
+def test_invalid_content_length(server, content_length):
+    status, body = post(server, b"{}", content_length=content_length)
+    assert status == 400
+    assert json.loads(body) == {"error": "Invalid Content-Length"}
+
+    # the server keeps serving
+    status, _ = post(server, json.dumps({"language": "en"}).encode())
+    assert status == 200
+
+
+@pytest.mark.parametrize("variable", ("_bibdb", "layout", "style"))
+def test_context_cant_override_reserved_variables(server, variable):
+    status, body = post(server, json.dumps(
+        {"language": "en", "context": {variable: {}}}
+    ).encode())
+    assert status == 400
+    assert variable in json.loads(body)["error"]